@@ -0,0 +1,198 @@
+import hashlib
+import math
+import pickle
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """Видят ли кеш по умолчанию другие процессы и веб-воркеры."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def _is_fresh(expires_at, delta, now):
+    """Вероятностное досрочное истечение (XFetch).
+
+    Чем ближе срок и чем дольше пересчёт, тем выше шанс, что один из
+    запросов пересчитает значение заранее, пока остальные берут кеш.
+    """
+    beta = settings.CACHE_EARLY_EXPIRY_BETA
+    return now - delta * beta * math.log(1 - random.random()) < expires_at
+
+
+def _recompute(key, compute, timeout):
+    started = time.time()
+    value = compute()
+    now = time.time()
+    cache.set(
+        key,
+        (value, now + timeout, now - started),
+        timeout + settings.CACHE_STALE_TTL,
+    )
+    return value
+
+
+def get_or_compute(key, compute, timeout):
+    """Значение из кеша с защитой от одновременного пересчёта.
+
+    Пересчитывает значение только один запрос: он берёт блокировку
+    через cache.add. Пока он работает, остальные получают устаревшее
+    значение, а если его нет, ждут результата не дольше
+    CACHE_WAIT_TIMEOUT.
+    """
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires_at, delta = entry
+        if _is_fresh(expires_at, delta, time.time()):
+            return value
+        if not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            return value
+        try:
+            return _recompute(key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+    return _wait_or_compute(key, compute, timeout)
+
+
+def _wait_or_compute(key, compute, timeout):
+    """Холодный кеш: считает один запрос, остальные ждут его результат."""
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + settings.CACHE_WAIT_TIMEOUT
+    while True:
+        if cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            try:
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+                return _recompute(key, compute, timeout)
+            finally:
+                cache.delete(lock_key)
+        time.sleep(settings.CACHE_WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() > deadline:
+            return compute()
+
+
+class ObjectCache:
+    """Read-through кеш объектов модели по уникальным полям.
+
+    Перед общим кешем стоит LRU в памяти процесса на
+    OBJECT_CACHE_LOCAL_SIZE записей. Об изменениях в других процессах
+    он не знает, поэтому запись в нём живёт OBJECT_CACHE_LOCAL_TTL
+    секунд, а общий кеш чистится через forget. Общий уровень
+    используется, только если кеш по умолчанию виден всем процессам:
+    forget в одном процессе не дотянется до locmem другого, и там
+    объект жил бы до OBJECT_CACHE_TIMEOUT. Каждый get отдаёт
+    свою копию объекта. Внутри транзакции кеш не используется:
+    она должна видеть свои изменения, а незакоммиченные строки
+    нельзя публиковать для других запросов.
+
+    Функция load(field, value) читает объект из базы или
+    возвращает None.
+    """
+
+    def __init__(self, name, load, fields=('pk',)):
+        self.name = name
+        self.load = load
+        self.fields = fields
+        self.lock = threading.Lock()
+        self.local = OrderedDict()
+        self.hits = Counter()
+        object_caches.append(self)
+
+    def key(self, field, value):
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'object:{self.name}:{field}:{digest}'
+
+    def get(self, field, value):
+        if any(conn.in_atomic_block for conn in connections.all()):
+            self.hits['bypass'] += 1
+            return self.load(field, value)
+        key = self.key(field, value)
+        with self.lock:
+            entry = self.local.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.local.move_to_end(key)
+                self.hits['local'] += 1
+                return pickle.loads(entry[0])
+        shared = cache_is_shared()
+        data = cache.get(key) if shared else None
+        if data is None:
+            self.hits['miss'] += 1
+            obj = self.load(field, value)
+            if obj is None:
+                return None
+            data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+            if shared:
+                cache.set(key, data, settings.OBJECT_CACHE_TIMEOUT)
+        else:
+            self.hits['shared'] += 1
+        self.remember(key, data)
+        return pickle.loads(data)
+
+    def remember(self, key, data):
+        expires_at = time.monotonic() + settings.OBJECT_CACHE_LOCAL_TTL
+        with self.lock:
+            self.local[key] = (data, expires_at)
+            self.local.move_to_end(key)
+            while len(self.local) > settings.OBJECT_CACHE_LOCAL_SIZE:
+                self.local.popitem(last=False)
+
+    def forget(self, field, values, using=None):
+        """Удаляет объекты с такими значениями поля из обоих уровней.
+
+        Если изменение идёт в транзакции, удаление повторяется после
+        коммита: параллельный запрос мог успеть положить в кеш
+        прежнюю строку.
+        """
+        keys = [self.key(field, value) for value in values]
+        if not keys:
+            return
+        with self.lock:
+            for key in keys:
+                self.local.pop(key, None)
+        cache.delete_many(keys)
+        if using is not None and connections[using].in_atomic_block:
+            transaction.on_commit(
+                lambda: self.forget(field, values), using=using
+            )
+
+    def forget_object(self, obj, using=None):
+        for field in self.fields:
+            self.forget(field, [getattr(obj, field)], using)
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
+
+    def stats(self):
+        lookups = sum(self.hits[kind] for kind in ('local', 'shared', 'miss'))
+        return {
+            'local_hits': self.hits['local'],
+            'shared_hits': self.hits['shared'],
+            'misses': self.hits['miss'],
+            'bypassed': self.hits['bypass'],
+            'hit_rate': (
+                (self.hits['local'] + self.hits['shared']) / lookups
+                if lookups else 0.0
+            ),
+            'local_size': len(self.local),
+        }
+
+
+object_caches = []
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import get_template
+from django.utils import timezone
+
+HEADER_TEMPLATE = 'includes/header.html'
+
+FOOTER_TEMPLATE = 'includes/footer.html'
+
+NAV_VIEWS = (
+    'about:author',
+    'about:tech',
+    'posts:post_create',
+    'users:password_change',
+    'users:logout',
+    'users:login',
+    'users:signup',
+)
+
+
+def header_key(authenticated, view_name, username):
+    """Ключ шапки: вход, активный пункт меню и имя пользователя.
+
+    Страницы вне меню отрисовывают одну и ту же шапку, поэтому
+    для них активный пункт пустой.
+    """
+    if view_name not in NAV_VIEWS:
+        view_name = ''
+    if not authenticated:
+        username = ''
+    return make_template_fragment_key(
+        'layout_header', [bool(authenticated), view_name, username]
+    )
+
+
+def footer_key(year):
+    return make_template_fragment_key('layout_footer', [year])
+
+
+def render_cached(key, template_name, context):
+    """Готовый HTML фрагмента из кеша или свежая отрисовка.
+
+    При LAYOUT_CACHE_TIMEOUT = 0 фрагмент отрисовывается каждый раз.
+    """
+    timeout = settings.LAYOUT_CACHE_TIMEOUT
+    if timeout:
+        html = cache.get(key)
+        if html is not None:
+            return html
+    html = get_template(template_name).render(context)
+    if timeout:
+        cache.set(key, html, timeout)
+    return html
+
+
+def render_header(request, user):
+    match = request.resolver_match
+    view_name = match.view_name if match else ''
+    return render_cached(
+        header_key(user.is_authenticated, view_name, user.username),
+        HEADER_TEMPLATE,
+        {'user': user, 'view_name': view_name},
+    )
+
+
+def render_footer():
+    year = timezone.now().year
+    return render_cached(footer_key(year), FOOTER_TEMPLATE, {'year': year})
+
+
+def forget_username(username):
+    """Удаляет шапки пользователя со старым именем."""
+    cache.delete_many([
+        header_key(True, view_name, username)
+        for view_name in NAV_VIEWS + ('',)
+    ])
@@ -0,0 +1,77 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает страницы с кешем шапки и подвала и без него'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--username', help='Пользователь для страниц после входа'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(
+            **({'username': options['username']}
+               if options['username'] else {})
+        ).order_by('pk').first()
+        if user is None:
+            raise CommandError('Нет пользователя для страниц после входа')
+        anonymous = Client()
+        member = Client()
+        member.force_login(user)
+        total = {'без кеша': 0, 'с кешем': 0}
+        pages = list(self.pages(anonymous, member, user))
+        for client, url in pages:
+            timings = {}
+            for label, timeout in (('без кеша', 0), ('с кешем', 60)):
+                with override_settings(LAYOUT_CACHE_TIMEOUT=timeout):
+                    cache.clear()
+                    client.get(url)
+                    started = time.perf_counter()
+                    for _ in range(options['repeat']):
+                        client.get(url)
+                    timings[label] = (
+                        time.perf_counter() - started
+                    ) / options['repeat']
+                total[label] += timings[label]
+            who = 'гость' if client is anonymous else user.username
+            self.report(f'{url} ({who})', timings)
+        self.report('В среднем по страницам', {
+            label: seconds / len(pages) for label, seconds in total.items()
+        })
+
+    def pages(self, anonymous, member, user):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=[user.username]),
+            reverse('about:author'),
+            reverse('about:tech'),
+        ]
+        group = Group.objects.order_by('pk').first()
+        if group:
+            urls.append(reverse('posts:group_list', args=[group.slug]))
+        post = Post.objects.order_by('pk').first()
+        if post:
+            urls.append(reverse('posts:post_detail', args=[post.pk]))
+        for url in urls:
+            yield anonymous, url
+            yield member, url
+        yield anonymous, reverse('users:login')
+        yield anonymous, reverse('users:signup')
+        yield member, reverse('posts:post_create')
+        yield member, reverse('posts:follow_index')
+
+    def report(self, name, timings):
+        before, after = timings['без кеша'], timings['с кешем']
+        self.stdout.write(
+            f'{name}: {before * 1000:.2f} -> {after * 1000:.2f} мс, '
+            f'экономия {(before - after) * 1000:.2f} мс на запрос'
+        )
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+
+class Command(BaseCommand):
+    help = 'Измеряет пропускную способность отдачи медиафайлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=8, help='Размер, МБ')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--range-size', type=int, default=1024 * 1024,
+            help='Размер одного диапазона для Range-запросов, байт',
+        )
+
+    def handle(self, *args, **options):
+        size = options['size'] * 1024 * 1024
+        media_root = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(media_root, 'posts'))
+            with open(os.path.join(media_root, 'posts', 'bench.bin'),
+                      'wb') as bench_file:
+                bench_file.write(os.urandom(size))
+            with override_settings(MEDIA_ROOT=media_root):
+                self.run(Client(), size, options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def run(self, client, size, options):
+        url = '/media/posts/bench.bin'
+        client.get(url)
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            response = client.get(url)
+            sum(len(chunk) for chunk in response.streaming_content)
+        self.report('Файл целиком', size * options['repeat'], started)
+
+        range_size = options['range_size']
+        started = time.perf_counter()
+        transferred = 0
+        for index in range(options['repeat']):
+            start = index * range_size % max(size - range_size, 1)
+            response = client.get(
+                url, HTTP_RANGE=f'bytes={start}-{start + range_size - 1}'
+            )
+            transferred += sum(
+                len(chunk) for chunk in response.streaming_content
+            )
+        self.report('Range-запросы', transferred, started)
+
+        started = time.perf_counter()
+        etag = client.get(url)['ETag']
+        for _ in range(options['repeat']):
+            client.get(url, HTTP_IF_NONE_MATCH=etag)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'304 по ETag: {elapsed / options["repeat"] * 1000:.3f} мс '
+            'на запрос'
+        )
+
+    def report(self, title, transferred, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{title}: {transferred / elapsed / 1024 / 1024:.1f} МБ/с'
+        )
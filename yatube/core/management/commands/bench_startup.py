@@ -0,0 +1,88 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SCRIPT = '''
+import io
+import json
+import os
+import sys
+import time
+
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+from yatube.wsgi import application
+loaded = time.perf_counter()
+statuses = []
+body = application({
+    'REQUEST_METHOD': 'GET',
+    'PATH_INFO': sys.argv[1],
+    'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80',
+    'HTTP_HOST': 'localhost',
+    'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr,
+    'wsgi.url_scheme': 'http',
+}, lambda status, headers, exc_info=None: statuses.append(status))
+b''.join(body)
+finished = time.perf_counter()
+print(json.dumps({
+    'import': loaded - started,
+    'response': finished - started,
+    'status': statuses[0],
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время от запуска процесса до первого ответа WSGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/')
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=settings.STARTUP_BUDGET,
+            help='Допустимая медиана до первого ответа, с',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+        runs = []
+        for number in range(1, options['runs'] + 1):
+            result = subprocess.run(
+                [sys.executable, '-c', SCRIPT, options['path']],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                raise CommandError(result.stderr.strip())
+            run = json.loads(result.stdout.strip().splitlines()[-1])
+            runs.append(run)
+            if not run['status'].startswith('200'):
+                self.stderr.write(
+                    f'{options["path"]} ответил {run["status"]}, '
+                    'проверьте базу данных и настройки'
+                )
+            self.stdout.write(
+                f'{number}: импорт {run["import"] * 1000:.0f} мс, '
+                f'первый ответ {run["response"] * 1000:.0f} мс '
+                f'({run["status"]})'
+            )
+        median = statistics.median(run['response'] for run in runs)
+        self.stdout.write(
+            f'Медиана до первого ответа: {median * 1000:.0f} мс, '
+            f'бюджет {options["budget"] * 1000:.0f} мс'
+        )
+        if median > options['budget']:
+            raise CommandError('Холодный старт не укладывается в бюджет')
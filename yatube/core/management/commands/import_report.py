@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFERRED_MODULES = (
+    'PIL',
+    'debug_toolbar',
+    'cProfile',
+    'sorl.thumbnail.engines',
+    'numpy',
+    'scipy',
+)
+
+
+def import_times(module):
+    """Время импорта модулей в чистом процессе по данным -X importtime.
+
+    Возвращает список (имя, собственное время, полное время) в мкс.
+    """
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, total, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue
+        rows.append((name.strip(), int(own), int(total)))
+    return rows
+
+
+def deferred_loaded(rows):
+    """Модули из DEFERRED_MODULES, попавшие в импорт при старте."""
+    return sorted(
+        name for name, _, _ in rows
+        if any(
+            name == module or name.startswith(module + '.')
+            for module in DEFERRED_MODULES
+        )
+    )
+
+
+class Command(BaseCommand):
+    help = 'Показывает, какие модули дольше всего импортируются при старте'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='yatube.wsgi')
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = import_times(options['module'])
+        total = sum(own for _, own, _ in rows)
+        self.stdout.write(
+            f'Импорт {options["module"]}: {total / 1000:.1f} мс, '
+            f'модулей {len(rows)}'
+        )
+        self.stdout.write('Дольше всего вместе с зависимостями:')
+        for name, own, cumulative in sorted(
+            rows, key=lambda row: -row[2]
+        )[:options['limit']]:
+            self.stdout.write(
+                f'{cumulative / 1000:8.1f} мс {own / 1000:8.1f} мс  {name}'
+            )
+        loaded = deferred_loaded(rows)
+        if loaded:
+            self.stderr.write(
+                'При старте загружены модули, которые должны '
+                'импортироваться лениво: ' + ', '.join(loaded)
+            )
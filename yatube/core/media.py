@@ -0,0 +1,174 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(path, stat):
+    """Сильный ETag по хешу содержимого, кешируется по mtime и размеру."""
+    key = 'media_etag:{}'.format(hashlib.md5(
+        f'{path}:{stat.st_mtime}:{stat.st_size}'.encode()
+    ).hexdigest())
+    etag = cache.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as media_file:
+            for chunk in iter(lambda: media_file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        cache.set(key, etag, None)
+    return etag
+
+
+def parse_range(header, size):
+    """Возвращает (начало, конец) для одного диапазона байтов или None.
+
+    None означает, что заголовок нужно проигнорировать и отдать файл
+    целиком (RFC 7233): он не разобран или просит несколько диапазонов.
+    Если начало не меньше size, диапазон вне файла.
+    """
+    match = RANGE_HEADER.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        length = int(end)
+        if not length:
+            return size, size
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+def if_range_matches(if_range, etag, mtime):
+    """If-Range совпадает с ETag или в точности с Last-Modified."""
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as media_file:
+        media_file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = media_file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def check_permission(request, path):
+    if settings.MEDIA_PERMISSION_CHECK is None:
+        return
+    if not import_string(settings.MEDIA_PERMISSION_CHECK)(request, path):
+        raise PermissionDenied
+
+
+def offload_response(path, name):
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    response = HttpResponse()
+    if backend == 'x-sendfile':
+        response['X-Sendfile'] = path
+    elif backend == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + name
+        )
+    else:
+        return None
+    return response
+
+
+def file_response(request, path, stat, etag, content_type):
+    size = stat.st_size
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if header and if_range_matches(if_range, etag, stat.st_mtime):
+        byte_range = parse_range(header, size)
+    if byte_range is not None:
+        if byte_range[0] >= size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(path, start, end),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
+    response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['Content-Length'] = str(size)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдаёт загруженные файлы с поддержкой Range и условных запросов.
+
+    Если задан MEDIA_SENDFILE_BACKEND, передача файла поручается
+    веб-серверу через X-Sendfile или X-Accel-Redirect, иначе файл
+    отдаётся через FileResponse, который использует sendfile сервера.
+    """
+    if not path.startswith(settings.MEDIA_SERVED_PREFIXES):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    check_permission(request, path)
+    stat = os.stat(full_path)
+    etag = file_etag(full_path, stat)
+    last_modified = http_date(stat.st_mtime)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        not_modified = etag in if_none_match or if_none_match == '*'
+    else:
+        not_modified = not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime,
+            stat.st_size,
+        )
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if not_modified:
+        response = HttpResponseNotModified()
+    else:
+        response = offload_response(full_path, path)
+        if response is None:
+            response = file_response(
+                request, full_path, stat, etag, content_type
+            )
+        else:
+            response['Content-Type'] = content_type
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = f'public, max-age={settings.MEDIA_MAX_AGE}'
+    return response
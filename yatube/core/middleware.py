@@ -0,0 +1,320 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import time
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import has_vary_header, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .storage import brotli
+
+logger = logging.getLogger('yatube.compression')
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+STATIC_ENCODINGS = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/atom+xml',
+    'application/rss+xml',
+)
+
+PROFILE_FLAG = '_profile'
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+compression_stats = defaultdict(lambda: {
+    'responses': 0,
+    'original': 0,
+    'compressed': 0,
+    'cpu': 0.0,
+})
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT без внешнего прокси.
+
+    Файлы с хешем в имени кешируются браузером навсегда, для остальных
+    работает проверка If-Modified-Since. Если клиент принимает сжатие,
+    отдаётся заранее сжатая копия файла.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            settings.STATIC_ROOT
+            and request.method in ('GET', 'HEAD')
+            and request.path.startswith(settings.STATIC_URL)
+        ):
+            response = self.serve(
+                request, request.path[len(settings.STATIC_URL):]
+            )
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime,
+            stat.st_size,
+        ):
+            return HttpResponseNotModified()
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = accepted_encodings(request)
+        encoding = None
+        for candidate, suffix in STATIC_ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                encoding = candidate
+                path += suffix
+                break
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+        )
+        response['Content-Length'] = os.path.getsize(path)
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Vary'] = 'Accept-Encoding'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if HASHED_NAME.search(name):
+            response['Cache-Control'] = (
+                f'public, max-age={settings.STATIC_IMMUTABLE_MAX_AGE}, '
+                'immutable'
+            )
+        else:
+            response['Cache-Control'] = (
+                f'public, max-age={settings.STATIC_MAX_AGE}'
+            )
+        return response
+
+
+class GzipStream:
+    def __init__(self):
+        self.compressor = zlib.compressobj(
+            6, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data):
+        return (
+            self.compressor.compress(data)
+            + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+
+    def compress(self, data):
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(
+            data, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    return gzip.compress(data, compresslevel=6)
+
+
+def accepted_encodings(request):
+    """Сжатия из Accept-Encoding клиента, кроме запрещённых через q=0."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def accepted_encoding(request):
+    """Выбирает лучшее сжатие из Accept-Encoding клиента."""
+    accepted = accepted_encodings(request)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    """Сжимает HTML и JSON ответы в brotli или gzip.
+
+    Потоковые ответы сжимаются по частям с досылкой каждого фрагмента.
+    Готовые сжатые тела общих для всех ответов хранятся в кеше по хешу
+    содержимого, поэтому повторная отдача той же страницы не тратит
+    процессор. На деле это страницы гостей без cookie: они собираются
+    из общих кешей фрагментов и шапки и совпадают побайтно. Личные
+    страницы и страницы с токеном CSRF не повторяются и в кеш не
+    попадают. Для каждого представления копится
+    статистика степени сжатия и затраченного процессорного времени.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.should_compress(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = accepted_encoding(request)
+        if encoding is None:
+            return response
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        if response.streaming:
+            stream = BrotliStream() if encoding == 'br' else GzipStream()
+            response.streaming_content = self.compress_stream(
+                response.streaming_content, stream, view_name
+            )
+            del response['Content-Length']
+        else:
+            started = time.thread_time()
+            if self.is_shared(request, response):
+                content = self.compressed_content(
+                    response.content, encoding
+                )
+            else:
+                content = compress_bytes(response.content, encoding)
+            cpu = time.thread_time() - started
+            self.record(view_name, len(response.content), len(content), cpu)
+            response['Server-Timing'] = f'compress;dur={cpu * 1000:.2f}'
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def should_compress(response):
+        if response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if response.streaming:
+            return True
+        return len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+    @staticmethod
+    def is_shared(request, response):
+        """Ответ одинаков для всех клиентов без cookie.
+
+        Vary: Cookie сессии ставят на каждую страницу, где читается
+        request.user, то есть на все. Такой ответ на запрос без cookie
+        получит любой гость, поэтому он тоже общий.
+        """
+        if response.cookies or request.META.get('CSRF_COOKIE_USED'):
+            return False
+        if has_vary_header(response, 'Cookie') and request.COOKIES:
+            return False
+        cache_control = response.get('Cache-Control', '').lower()
+        return not any(
+            directive in cache_control
+            for directive in ('private', 'no-cache', 'no-store')
+        )
+
+    @staticmethod
+    def compressed_content(content, encoding):
+        if len(content) > settings.COMPRESSION_CACHE_MAX_SIZE:
+            return compress_bytes(content, encoding)
+        key = 'compressed:{}:{}'.format(
+            encoding, hashlib.md5(content).hexdigest()
+        )
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress_bytes(content, encoding)
+            cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+        return compressed
+
+    def compress_stream(self, content, stream, view_name):
+        original = compressed = 0
+        cpu = 0.0
+        for chunk in content:
+            started = time.thread_time()
+            data = stream.compress(chunk)
+            cpu += time.thread_time() - started
+            original += len(chunk)
+            compressed += len(data)
+            if data:
+                yield data
+        data = stream.finish()
+        compressed += len(data)
+        self.record(view_name, original, compressed, cpu)
+        yield data
+
+    @staticmethod
+    def record(view_name, original, compressed, cpu):
+        stats = compression_stats[view_name]
+        stats['responses'] += 1
+        stats['original'] += original
+        stats['compressed'] += compressed
+        stats['cpu'] += cpu
+        logger.debug(
+            '%s: %d -> %d bytes (%.1f%%), %.2f ms',
+            view_name,
+            original,
+            compressed,
+            compressed / original * 100 if original else 0,
+            cpu * 1000,
+        )
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос сотрудника по флагу ?_profile или заголовку.
+
+    Остальные запросы проходят без профилировщика, проверка флага
+    стоит дешевле обращения к пользователю из сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            PROFILE_FLAG not in request.GET
+            and PROFILE_HEADER not in request.META
+        ) or not request.user.is_staff:
+            return self.get_response(request)
+        from .profiling import profile_request
+        return profile_request(self.get_response, request)
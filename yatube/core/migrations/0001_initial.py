@@ -0,0 +1,38 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=2000)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration', models.FloatField()),
+                ('sql_count', models.PositiveIntegerField()),
+                ('sql_duration', models.FloatField()),
+                ('queries', models.TextField()),
+                ('templates', models.TextField()),
+                ('call_tree', models.TextField()),
+                ('stats', models.BinaryField()),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+    ]
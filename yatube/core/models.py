@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    path = models.CharField(max_length=2000)
+    view_name = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='request_profiles',
+    )
+    status_code = models.PositiveSmallIntegerField()
+    duration = models.FloatField()
+    sql_count = models.PositiveIntegerField()
+    sql_duration = models.FloatField()
+    queries = models.TextField()
+    templates = models.TextField()
+    call_tree = models.TextField()
+    stats = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return f'{self.path} ({self.duration * 1000:.0f} мс)'
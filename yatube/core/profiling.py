@@ -0,0 +1,160 @@
+import json
+import marshal
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+_local = threading.local()
+
+_patch_lock = threading.Lock()
+
+_patch_users = 0
+
+_original_render = Template._render
+
+
+def _timed_render(self, context):
+    timings = getattr(_local, 'templates', None)
+    if timings is None:
+        return _original_render(self, context)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        timings.append({
+            'name': self.origin.template_name or str(self.origin),
+            'duration': time.perf_counter() - started,
+        })
+
+
+@contextmanager
+def template_timings():
+    """Засекает время отрисовки шаблонов в текущем потоке.
+
+    Обёртка над Template._render ставится только пока идёт хотя бы
+    один профилируемый запрос, остальные потоки её не замечают.
+    """
+    global _patch_users
+    with _patch_lock:
+        if not _patch_users:
+            Template._render = _timed_render
+        _patch_users += 1
+    _local.templates = timings = []
+    try:
+        yield timings
+    finally:
+        _local.templates = None
+        with _patch_lock:
+            _patch_users -= 1
+            if not _patch_users:
+                Template._render = _original_render
+
+
+@contextmanager
+def sql_log():
+    """Собирает SQL-запросы всех подключений без DEBUG."""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            queries.append({
+                'sql': sql,
+                'duration': time.perf_counter() - started,
+            })
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield queries
+
+
+def _label(func):
+    file_name, line, name = func
+    if file_name == '~':
+        return name
+    if file_name.startswith(settings.BASE_DIR):
+        file_name = file_name[len(settings.BASE_DIR) + 1:]
+    return f'{name} ({file_name}:{line})'
+
+
+def call_tree(stats, min_share=None):
+    """Дерево вызовов из pstats с отсечением мелких ветвей.
+
+    Корень - вызов с наибольшим полным временем, то есть сам запрос.
+    Узел: имя функции, число вызовов, собственное и полное время.
+    Ветви дешевле min_share от общего времени и глубже
+    PROFILE_TREE_DEPTH не показываются.
+    """
+    if min_share is None:
+        min_share = settings.PROFILE_MIN_SHARE
+    children = {}
+    for func, (_, calls, own, total, callers) in stats.items():
+        for caller, caller_stats in callers.items():
+            children.setdefault(caller, []).append((func, caller_stats))
+    root = max(stats, key=lambda func: stats[func][3])
+    overall = stats[root][3] or 1
+
+    def build(func, calls, own, total, path):
+        node = {
+            'name': _label(func),
+            'calls': calls,
+            'own': own,
+            'total': total,
+            'share': total / overall,
+            'children': [],
+        }
+        if func in path or len(path) >= settings.PROFILE_TREE_DEPTH:
+            return node
+        for child, child_stats in sorted(
+            children.get(func, ()), key=lambda item: -item[1][3]
+        ):
+            if child_stats[3] / overall < min_share:
+                continue
+            node['children'].append(build(
+                child,
+                child_stats[1],
+                child_stats[2],
+                child_stats[3],
+                path | {func},
+            ))
+        return node
+
+    return build(root, stats[root][1], stats[root][2], overall, set())
+
+
+def profile_request(get_response, request):
+    """Выполняет запрос под cProfile и сохраняет RequestProfile."""
+    import cProfile
+    import pstats
+
+    from .models import RequestProfile
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    with sql_log() as queries, template_timings() as templates:
+        response = profiler.runcall(get_response, request)
+    duration = time.perf_counter() - started
+    stats = pstats.Stats(profiler).stats
+    match = request.resolver_match
+    profile = RequestProfile.objects.create(
+        path=request.get_full_path(),
+        view_name=match.view_name if match else '',
+        user=request.user,
+        status_code=response.status_code,
+        duration=duration,
+        sql_count=len(queries),
+        sql_duration=sum(query['duration'] for query in queries),
+        queries=json.dumps(queries),
+        templates=json.dumps(templates),
+        call_tree=json.dumps(call_tree(stats)),
+        stats=marshal.dumps(stats),
+    )
+    response['X-Profile-Id'] = str(profile.pk)
+    return response
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from .layout import forget_username
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def forget_renamed_header(sender, instance, update_fields, raw, **kwargs):
+    """Сбрасывает шапки со старым именем, если пользователь переименован."""
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    old = sender._base_manager.filter(pk=instance.pk).values_list(
+        'username', flat=True
+    ).first()
+    if old is not None and old != instance.username:
+        forget_username(old)
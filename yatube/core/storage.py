@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import os
+import re
+import time
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.html', '.json')
+
+CONTENT_ADDRESSED_NAME = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def compressed_copies(content):
+    """Сжатые варианты файла: пары (расширение, байты)."""
+    copies = [('.gz', gzip.compress(content, compresslevel=9))]
+    if brotli is not None:
+        copies.append(('.br', brotli.compress(content)))
+    return [
+        (suffix, data) for suffix, data in copies
+        if len(data) < len(content)
+    ]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем в имени и заранее сжатыми копиями gzip и brotli.
+
+    Пока collectstatic не запускался, ссылки ведут на исходные имена,
+    поэтому разработка и тесты работают без собранной статики.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if (
+                not dry_run
+                and hashed_name
+                and hashed_name.endswith(COMPRESSIBLE_EXTENSIONS)
+            ):
+                self.compress(hashed_name)
+            yield name, hashed_name, processed
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        for suffix, data in compressed_copies(content):
+            with open(self.path(name + suffix), 'wb') as compressed:
+                compressed.write(data)
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(name, digest):
+    """Имя файла по хешу содержимого: posts/ab/ab12….gif."""
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, digest[:2], digest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла определяется его содержимым.
+
+    Одинаковые загрузки получают одно имя и хранятся в одном экземпляре,
+    поэтому и миниатюры для них строятся один раз. Повторная загрузка
+    обновляет время изменения файла: пока пост с ней не сохранён,
+    освобождение файла другим постом видит свежую дату и его не трогает.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_content_addressed(name) and self.exists(name):
+            # Тот же файл успел записать параллельный запрос.
+            raise FileExistsError(name)
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        name = content_addressed_name(name, content_digest(content))
+        if self.exists(name):
+            return self.touch(name)
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            return self.touch(name)
+
+    def touch(self, name):
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            pass
+        return name
+
+    def saved_within(self, name, seconds):
+        """Файл записан или загружен повторно меньше seconds назад."""
+        try:
+            modified = os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return time.time() - modified < seconds
+
+    @staticmethod
+    def is_content_addressed(name):
+        return bool(CONTENT_ADDRESSED_NAME.search(name))
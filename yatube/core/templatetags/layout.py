@@ -0,0 +1,21 @@
+from django import template
+from django.contrib.auth.models import AnonymousUser
+from django.utils.safestring import mark_safe
+
+from core.layout import render_footer, render_header
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def layout_header(context):
+    """Шапка сайта, отрисованная один раз на состояние входа и пункт меню."""
+    request = context.get('request')
+    user = context.get('user') or AnonymousUser()
+    return mark_safe(render_header(request, user))
+
+
+@register.simple_tag
+def layout_footer():
+    """Подвал сайта, отрисованный один раз в год."""
+    return mark_safe(render_footer())
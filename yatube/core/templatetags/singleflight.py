@@ -0,0 +1,47 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache import get_or_compute
+
+register = template.Library()
+
+
+class SingleFlightCacheNode(CacheNode):
+    def render(self, context):
+        try:
+            timeout = int(self.expire_time_var.resolve(context))
+        except (template.VariableDoesNotExist, TypeError, ValueError):
+            raise template.TemplateSyntaxError(
+                f'"singleflight_cache" tag got a non-integer timeout value: '
+                f'{self.expire_time_var.var!r}'
+            )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag('singleflight_cache')
+def do_singleflight_cache(parser, token):
+    """Аналог {% cache %} с защитой от одновременного пересчёта.
+
+        {% singleflight_cache 20 index_page page_obj.number %}
+            ...
+        {% endsingleflight_cache %}
+    """
+    nodelist = parser.parse(('endsingleflight_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    return SingleFlightCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        None,
+    )
@@ -1,6 +1,34 @@
+import gzip
+import hashlib
+import marshal
+import os
+import shutil
+import tempfile
+import threading
+import time
 from http import HTTPStatus
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import get_or_compute
+from core.layout import header_key
+from core.management.commands.import_report import (deferred_loaded,
+                                                    import_times)
+from core.middleware import CompressionMiddleware
+from core.models import RequestProfile
+from posts.models import User
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class CoreTests(TestCase):
@@ -10,3 +38,329 @@ class CoreTests(TestCase):
         response = self.client.get('/unexisting_page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class CompressionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_html_page_compressed(self):
+        """HTML страница сжимается, если клиент принимает gzip."""
+        plain = self.client.get('/')
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def compress(self, response, **extra):
+        middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING='gzip', **extra
+        )
+        request.resolver_match = None
+        return middleware(request)
+
+    def test_only_shared_responses_cached(self):
+        """Сжатое тело кешируется только у ответов, общих для всех."""
+        content = b'<p>page</p>' * 50
+        key = f'compressed:gzip:{hashlib.md5(content).hexdigest()}'
+        self.compress(HttpResponse(content))
+        self.assertIsNotNone(cache.get(key))
+        cache.clear()
+        personal = HttpResponse(content)
+        personal['Vary'] = 'Cookie'
+        self.compress(personal, HTTP_COOKIE='sessionid=session')
+        with_cookie = HttpResponse(content)
+        with_cookie.set_cookie('csrftoken', 'token')
+        response = self.compress(with_cookie)
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertIsNone(cache.get(key))
+
+    def test_guest_page_body_cached(self):
+        """Страница гостя без cookie сжимается один раз."""
+        response = self.client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertIn('Cookie', response['Vary'])
+        key = 'compressed:gzip:{}'.format(
+            hashlib.md5(gzip.decompress(response.content)).hexdigest()
+        )
+        self.assertEqual(cache.get(key), response.content)
+
+    def test_streaming_response_compressed(self):
+        """Потоковый ответ сжимается по частям."""
+        chunks = [b'<p>chunk</p>' * 50 for _ in range(3)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(chunks))
+        )
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        request.resolver_match = None
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), b''.join(chunks))
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticFilesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def test_hashed_static_is_immutable_and_compressed(self):
+        """Статика с хешем отдаётся сжатой и кешируется навсегда."""
+        url = staticfiles_storage.url('css/bootstrap.min.css')
+        self.assertNotEqual(url, settings.STATIC_URL + 'css/bootstrap.min.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_static_encoding_negotiated(self):
+        """Сжатие с q=0 и похожие имена не выбираются."""
+        url = staticfiles_storage.url('css/bootstrap.min.css')
+        for accept, encoding in (
+            ('br;q=0, gzip', 'gzip'),
+            ('gzip;q=0', None),
+            ('x-gzip-custom', None),
+        ):
+            with self.subTest(accept=accept):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING=accept)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+
+    def test_unhashed_static_is_revalidated(self):
+        """Статика без хеша проверяется по If-Modified-Since."""
+        url = settings.STATIC_URL + 'img/logo.png'
+        response = self.client.get(url)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.content = bytes(range(256)) * 4
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'file.bin'),
+                  'wb') as media_file:
+            media_file.write(cls.content)
+        cls.url = '/media/posts/file.bin'
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_file_with_etag(self):
+        """Файл отдаётся целиком с сильным ETag, повтор получает 304."""
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertFalse(response['ETag'].startswith('W/'))
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_range_request(self):
+        """Range-запрос возвращает только нужные байты."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[10:20]
+        )
+        self.assertEqual(
+            response['Content-Range'], f'bytes 10-19/{len(self.content)}'
+        )
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+        )
+
+    def test_unsupported_range_ignored(self):
+        """Несколько диапазонов или битый заголовок - файл целиком."""
+        for header in ('bytes=0-1,5-6', 'bytes=9-3', 'items=0-1'):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(
+                b''.join(response.streaming_content), self.content
+            )
+
+    def test_if_range_accepts_date(self):
+        """If-Range с датой изменения файла даёт диапазон, устаревшая - всё."""
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        response = self.client.get(
+            self.url,
+            HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='Mon, 01 Jan 2001 00:00:00 GMT',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='x-accel-redirect')
+    def test_accel_redirect_offload(self):
+        """Передача файла поручается веб-серверу."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + 'posts/file.bin',
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_only_allowed_prefixes_served(self):
+        """Файлы вне разрешённых каталогов не отдаются."""
+        response = self.client.get('/media/../settings.py')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SingleFlightCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def storm(self, key, timeout=20, requests=20):
+        """Одновременные запросы к кешу; считает запросы к БД.
+
+        У каждого потока своё соединение, поэтому запросы собираются
+        в каждом потоке отдельно.
+        """
+        queries = []
+        results = []
+
+        def compute():
+            count = User.objects.count()
+            time.sleep(0.1)
+            return f'value {len(queries) + 1} of {count}'
+
+        def request():
+            try:
+                with CaptureQueriesContext(connection) as captured:
+                    results.append(get_or_compute(key, compute, timeout))
+                queries.extend(captured.captured_queries)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=request) for _ in range(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return queries, results
+
+    def test_cold_cache_computed_once(self):
+        """При пустом кеше значение пересчитывает только один запрос."""
+        queries, results = self.storm('cold')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(set(results), {'value 1 of 0'})
+
+    def test_expired_value_served_stale_during_recompute(self):
+        """После истечения один запрос пересчитывает, другие берут старое."""
+        cache.set('stale', ('old', time.time() - 1, 0.1), 60)
+        queries, results = self.storm('stale')
+        self.assertEqual(len(queries), 1)
+        self.assertIn('old', results)
+        self.assertEqual(cache.get('stale')[0], 'value 1 of 0')
+
+
+class LayoutCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_header_rendered_once_per_state(self):
+        """Шапка берётся из кеша по входу, пункту меню и имени."""
+        self.client.get(reverse('posts:index'))
+        key = header_key(True, 'posts:index', 'NoName')
+        self.assertIn('Пользователь: NoName', cache.get(key))
+        cache.set(key, '<header>из кеша</header>')
+        response = self.client.get(reverse('posts:profile', args=['NoName']))
+        self.assertContains(response, '<header>из кеша</header>')
+        response = self.client.get(reverse('about:author'))
+        self.assertNotContains(response, 'из кеша')
+        self.assertContains(response, 'nav-link active')
+
+    def test_renamed_user_header_dropped(self):
+        """После смены имени шапка со старым именем не отдаётся."""
+        self.client.get(reverse('about:tech'))
+        key = header_key(True, 'about:tech', 'NoName')
+        self.assertIsNotNone(cache.get(key))
+        self.user.username = 'Renamed'
+        self.user.save()
+        self.assertIsNone(cache.get(key))
+        response = self.client.get(reverse('about:tech'))
+        self.assertContains(response, 'Пользователь: Renamed')
+
+    def test_footer_year_not_shadowed_by_view(self):
+        """Год в подвале текущий и на страницах со своим year."""
+        response = self.client.get(reverse('posts:calendar_year', args=[2001]))
+        self.assertContains(response, f'© {timezone.now().year} ')
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='NoName')
+
+    def setUp(self):
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_staff_request_profiled(self):
+        """Запрос сотрудника с флагом сохраняет профиль."""
+        response = self.staff_client.get(
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            {'_profile': 1},
+        )
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.view_name, 'posts:profile')
+        self.assertGreater(profile.sql_count, 0)
+        self.assertIn('posts/profile.html', profile.templates)
+        self.assertIn('profile', profile.call_tree)
+        detail = self.staff_client.get(
+            reverse('core:profile_detail', args=[profile.pk])
+        )
+        self.assertContains(detail, 'Дерево вызовов')
+        stats = self.staff_client.get(
+            reverse('core:profile_stats', args=[profile.pk])
+        )
+        self.assertIsInstance(marshal.loads(stats.content), dict)
+
+    def test_other_requests_not_profiled(self):
+        """Без флага и для обычных пользователей профиль не пишется."""
+        client = Client()
+        client.force_login(self.user)
+        client.get('/', {'_profile': 1})
+        self.staff_client.get('/')
+        self.assertFalse(RequestProfile.objects.exists())
+        response = client.get(reverse('core:profile_list'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class StartupTests(TestCase):
+
+    def test_heavy_modules_not_imported_at_startup(self):
+        """При загрузке WSGI не импортируются отложенные модули."""
+        self.assertEqual(deferred_loaded(import_times('yatube.wsgi')), [])
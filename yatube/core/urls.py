@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.profile_list, name='profile_list'),
+    path('<int:profile_id>/', views.profile_detail, name='profile_detail'),
+    path(
+        '<int:profile_id>/stats/',
+        views.profile_stats,
+        name='profile_stats',
+    ),
+    path('objects/', views.object_cache_stats, name='object_cache_stats'),
+]
@@ -1,4 +1,13 @@
-from django.shortcuts import render
+import json
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+
+from posts.utils import paginator
+
+from .cache import object_caches
+from .models import RequestProfile
 
 
 def page_not_found(request, exception):
@@ -21,3 +30,58 @@ def failure_403(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profile_list(request):
+    profiles = RequestProfile.objects.select_related('user').defer(
+        'queries', 'templates', 'call_tree', 'stats'
+    )
+    return render(
+        request,
+        'core/profile_list.html',
+        {'page_obj': paginator(request, profiles)},
+    )
+
+
+@staff_member_required
+def profile_detail(request, profile_id):
+    profile = get_object_or_404(
+        RequestProfile.objects.defer('stats'), pk=profile_id
+    )
+    templates = {}
+    for timing in json.loads(profile.templates):
+        row = templates.setdefault(
+            timing['name'], {'name': timing['name'], 'renders': 0, 'total': 0}
+        )
+        row['renders'] += 1
+        row['total'] += timing['duration']
+    return render(request, 'core/profile_detail.html', {
+        'profile': profile,
+        'call_tree': json.loads(profile.call_tree),
+        'queries': json.loads(profile.queries),
+        'templates': sorted(templates.values(), key=lambda row: -row['total']),
+    })
+
+
+@staff_member_required
+def profile_stats(request, profile_id):
+    profile = get_object_or_404(
+        RequestProfile.objects.only('stats'), pk=profile_id
+    )
+    response = HttpResponse(
+        bytes(profile.stats), content_type='application/octet-stream'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="profile-{profile_id}.prof"'
+    )
+    return response
+
+
+@staff_member_required
+def object_cache_stats(request):
+    """Попадания в кеш объектов этого процесса с момента запуска."""
+    return JsonResponse({
+        object_cache.name: object_cache.stats()
+        for object_cache in object_caches
+    })
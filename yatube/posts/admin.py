@@ -1,39 +1,153 @@
-from django.contrib import admin
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-from .models import Comment, Follow, Group, Post
+from .models import (Comment, Follow, Group, GroupFollow, Post, PurgeTask,
+                     User)
+from .object_cache import forget_posts
+from .purge import schedule_purge
 
 
-class PostAdmin(admin.ModelAdmin):
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает строки большой таблицы целиком.
+
+    Для списка без фильтров берётся оценка числа строк из статистики
+    базы данных: pg_class в PostgreSQL, sqlite_stat1 после ANALYZE в
+    SQLite. Отфильтрованные и небольшие списки, а также таблицы без
+    статистики считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return super().count
+        estimate = self.estimate(queryset)
+        if estimate is None or estimate < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+    @staticmethod
+    def estimate(queryset):
+        """Число строк таблицы по статистике базы или None."""
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [table],
+                )
+                row = cursor.fetchone()
+                return int(row[0]) if row and row[0] >= 0 else None
+            if connection.vendor != 'sqlite':
+                return None
+            if 'sqlite_stat1' not in connection.introspection.table_names(
+                cursor
+            ):
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+            )
+            rows = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+        return max(rows) if rows else None
+
+
+class MoveToGroupForm(ActionForm):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label='Группа',
+        widget=AutocompleteSelect(
+            Post._meta.get_field('group').remote_field,
+            admin.site,
+        ),
+    )
+
+
+class BackgroundDeleteMixin:
+    """Удаление из админки скрывает объект и ставит его в очередь."""
+
+    def delete_model(self, request, obj):
+        schedule_purge(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_purge(obj)
+
+    def get_deleted_objects(self, objs, request):
+        to_delete = [str(obj) for obj in objs]
+        return to_delete, {}, set(), []
+
+
+class PostAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
         'pub_date',
         'author',
         'group',
+        'is_deleted',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', 'is_deleted')
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = MoveToGroupForm
+    actions = ('move_to_group',)
     empty_value_display = '-пусто-'
 
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid():
+            self.message_user(
+                request, 'Выберите существующую группу.', messages.ERROR
+            )
+            return
+        ids = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(group=form.cleaned_data['group'])
+        forget_posts(ids)
+        self.message_user(request, f'Перенесено постов: {updated}')
+
+    move_to_group.short_description = 'Перенести в группу'
 
-class GroupAdmin(admin.ModelAdmin):
+
+class GroupAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'title',
         'slug',
         'description',
+        'is_deleted',
     )
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'post',
         'author',
         'text',
+        'is_deleted',
     )
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    date_hierarchy = 'created'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -43,10 +157,48 @@ class FollowAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
     empty_value_display = '-пусто-'
 
 
+class GroupFollowAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'group',
+    )
+    list_select_related = ('user', 'group')
+    autocomplete_fields = ('user', 'group')
+    empty_value_display = '-пусто-'
+
+
+class PurgeTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'kind',
+        'object_id',
+        'status',
+        'removed',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'kind')
+    readonly_fields = list_display[1:]
+
+    def has_add_permission(self, request):
+        return False
+
+
+class BackgroundDeleteUserAdmin(BackgroundDeleteMixin, UserAdmin):
+    pass
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(GroupFollow, GroupFollowAdmin)
+admin.site.register(PurgeTask, PurgeTaskAdmin)
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeleteUserAdmin)
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.db import transaction
+
+from .counters import flush_all
+from .models import ArchivedComment, ArchivedPost, Comment, Post, Reaction
+from .months import count_post
+from .shards import on_shards
+
+
+class ArchiveChain:
+    """Последовательность постов: сначала горячая таблица, затем архив.
+
+    Архивируются только посты старше порога, поэтому склейка сохраняет
+    сортировку по убыванию даты. Архив запрашивается лишь тогда, когда
+    срез страницы выходит за пределы горячей таблицы.
+    """
+
+    ordered = True
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = {}
+
+    def _count(self, index):
+        if index not in self._counts:
+            self._counts[index] = self.querysets[index].count()
+        return self._counts[index]
+
+    def count(self):
+        return sum(self._count(i) for i in range(len(self.querysets)))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        result = []
+        for i, queryset in enumerate(self.querysets):
+            if stop <= 0:
+                break
+            size = self._count(i)
+            if start < size:
+                result.extend(queryset[start:min(stop, size)])
+            start = max(start - size, 0)
+            stop -= size
+        return result
+
+
+def archive_posts(cutoff, batch_size=None):
+    """Переносит посты старше cutoff вместе с комментариями в архив.
+
+    Архив каждого шарда лежит на том же шарде, что и посты. Удаление
+    из горячей таблицы вычитает пост из помесячных счётчиков, поэтому
+    он сразу добавляется обратно: в буфере дельты взаимно гасятся.
+    Реакции удаляются без сигналов: на архивный пост реагировать
+    нельзя, а их счётчики остаются как есть.
+    """
+    batch_size = batch_size or settings.POST_ARCHIVE_BATCH_SIZE
+    archived = sum(
+        _archive_shard(posts, batch_size)
+        for posts in on_shards(
+            Post.objects.filter(pub_date__lt=cutoff, is_deleted=False)
+        )
+    )
+    flush_all()
+    return archived
+
+
+def _archive_shard(old_posts, batch_size):
+    alias = old_posts.db
+    archived = 0
+    while True:
+        with transaction.atomic(using=alias):
+            posts = list(old_posts.order_by('pub_date', 'id')[:batch_size])
+            if not posts:
+                break
+            ids = [post.id for post in posts]
+            ArchivedPost.objects.using(alias).bulk_create([
+                ArchivedPost(
+                    id=post.id,
+                    text=post.text,
+                    text_html=post.text_html,
+                    pub_date=post.pub_date,
+                    author_id=post.author_id,
+                    group_id=post.group_id,
+                    image=post.image.name,
+                    views=post.views,
+                ) for post in posts
+            ])
+            comments = Comment.objects.using(alias).filter(post_id__in=ids)
+            kept = list(comments.filter(is_deleted=False).order_by('path'))
+            kept_ids = {comment.id for comment in kept}
+            ArchivedComment.objects.using(alias).bulk_create([
+                ArchivedComment(
+                    id=comment.id,
+                    post_id=comment.post_id,
+                    author_id=comment.author_id,
+                    parent_id=(
+                        comment.parent_id
+                        if comment.parent_id in kept_ids else None
+                    ),
+                    path=comment.path,
+                    depth=comment.depth,
+                    reply_count=comment.reply_count,
+                    text=comment.text,
+                    text_html=comment.text_html,
+                    created=comment.created,
+                ) for comment in kept
+            ])
+            comments.delete()
+            Reaction.objects.using(alias).filter(
+                post_id__in=ids
+            )._raw_delete(alias)
+            Post.objects.using(alias).filter(id__in=ids).delete()
+        for post in posts:
+            count_post(post, 1)
+        archived += len(posts)
+    return archived
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_finished
+
+logger = logging.getLogger('yatube.counters')
+
+
+class BufferedCounter:
+    """Копит приращения счётчиков в памяти процесса и пишет их пачкой.
+
+    Вместо UPDATE на каждое событие в базу раз в
+    COUNTER_FLUSH_INTERVAL секунд уходит одна запись на каждый
+    изменившийся ключ. Функция write получает словарь {ключ: дельта}.
+    Сброс проверяется после каждого запроса; то, что не успело
+    записаться до остановки процесса, теряется.
+    """
+
+    def __init__(self, name, write):
+        self.name = name
+        self.write = write
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.last_flush = time.monotonic()
+        self.increments = 0
+        self.writes = 0
+        counters.append(self)
+
+    def add(self, key, delta=1):
+        with self.lock:
+            self.pending[key] += delta
+            self.increments += 1
+        self.maybe_flush()
+
+    def pending_delta(self, key):
+        return self.pending.get(key, 0)
+
+    def pending_items(self):
+        with self.lock:
+            return list(self.pending.items())
+
+    def maybe_flush(self):
+        interval = settings.COUNTER_FLUSH_INTERVAL
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленное и возвращает число записанных ключей."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.last_flush = time.monotonic()
+        pending = {key: delta for key, delta in pending.items() if delta}
+        if not pending:
+            return 0
+        try:
+            self.write(pending)
+        except Exception:
+            with self.lock:
+                self.pending.update(pending)
+            raise
+        self.writes += len(pending)
+        logger.info(
+            '%s: flushed %d keys, %d writes saved over %d increments',
+            self.name,
+            len(pending),
+            self.saved_writes,
+            self.increments,
+        )
+        return len(pending)
+
+    @property
+    def saved_writes(self):
+        return max(self.increments - self.writes - sum(
+            1 for delta in self.pending.values() if delta
+        ), 0)
+
+
+counters = []
+
+
+def flush_due(**kwargs):
+    for counter in counters:
+        counter.maybe_flush()
+
+
+def flush_all():
+    """Сбрасывает все счётчики сразу.
+
+    Команды вызывают её перед выходом: у них нет request_finished, и
+    накопленное в буфере иначе пропало бы вместе с процессом.
+    """
+    for counter in counters:
+        counter.flush()
+
+
+request_finished.connect(flush_due, dispatch_uid='posts.counters.flush_due')
@@ -0,0 +1,147 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import linebreaksbr
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from core.cache import get_or_compute
+
+from .models import Group, Post, User
+from .shards import ScatterGather
+
+FEED_VERSION_KEY = 'feeds:version'
+
+FEED_FIELDS = ('id', 'text', 'text_html', 'pub_date', 'author__username')
+
+
+def feed_version():
+    return cache.get_or_set(FEED_VERSION_KEY, time.time(), None)
+
+
+def bump_feed_version():
+    cache.set(FEED_VERSION_KEY, time.time(), None)
+
+
+def cached_feed(feed_view):
+    """Кеширует ленту до следующего изменения постов.
+
+    Версия лент меняется при сохранении и удалении постов, поэтому
+    повторный опрос без изменений получает 304 по ETag или
+    Last-Modified, а новый клиент получает уже готовый XML.
+    """
+
+    def cache_key(request, **kwargs):
+        return 'feeds:{}:{}'.format(request.path, feed_version())
+
+    def etag(request, **kwargs):
+        return hashlib.md5(cache_key(request).encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        return datetime.fromtimestamp(feed_version(), tz=timezone.utc)
+
+    @wraps(feed_view)
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def view(request, **kwargs):
+        def render():
+            response = feed_view(request, **kwargs)
+            return response.content, response['Content-Type']
+
+        content, content_type = get_or_compute(
+            cache_key(request), render, settings.FEED_CACHE_TIMEOUT
+        )
+        return HttpResponse(content, content_type=content_type)
+
+    return view
+
+
+class LatestPostsFeed(Feed):
+    title = 'Последние обновления на сайте'
+    link = reverse_lazy('posts:index')
+    description = 'Новые посты всех авторов Yatube'
+
+    def items(self):
+        return ScatterGather(
+            Post.objects.visible().select_related('author').only(*FEED_FIELDS)
+        )[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(settings.FEED_TITLE_LENGTH)
+
+    def item_description(self, item):
+        return item.text_html or linebreaksbr(item.text)
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.id})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug, is_deleted=False)
+
+    def title(self, group):
+        return f'Записи сообщества {group.title}'
+
+    def link(self, group):
+        return reverse('posts:group_list', kwargs={'slug': group.slug})
+
+    def description(self, group):
+        return group.description
+
+    def items(self, group):
+        return ScatterGather(
+            group.posts.visible().select_related('author').only(*FEED_FIELDS)
+        )[:settings.FEED_ITEMS]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username, is_active=True)
+
+    def title(self, author):
+        return f'Посты пользователя {author.get_full_name() or author}'
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def description(self, author):
+        return self.title(author)
+
+    def items(self, author):
+        return author.posts.filter(is_deleted=False).select_related(
+            'author'
+        ).only(*FEED_FIELDS)[:settings.FEED_ITEMS]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, group):
+        return group.description
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, author):
+        return self.title(author)
@@ -0,0 +1,100 @@
+import hashlib
+import re
+import struct
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+WORD = re.compile(r'\w+')
+
+SIGNATURE_SIZE = 32
+
+BANDS = 10
+
+BAND_ROWS = 3
+
+BAND_FIELDS = tuple(f'minhash_band_{band}' for band in range(BANDS))
+
+SIGNATURE = struct.Struct(f'<{SIGNATURE_SIZE}I')
+
+
+def _hashes(word):
+    """SIGNATURE_SIZE независимых 32-битных хешей слова."""
+    data = word.encode()
+    return SIGNATURE.unpack(
+        hashlib.blake2b(data, digest_size=64, person=b'minhash0').digest()
+        + hashlib.blake2b(data, digest_size=64, person=b'minhash1').digest()
+    )
+
+
+def minhash(text):
+    """MinHash-подпись множества слов текста.
+
+    Для слишком короткого текста возвращает None: на нескольких словах
+    похожими оказываются и обычные реплики вроде «спасибо, отличный пост».
+    """
+    words = set(WORD.findall(text.lower()))
+    if len(words) < settings.DUPLICATE_MIN_TOKENS:
+        return None
+    return SIGNATURE.pack(*map(min, zip(*map(_hashes, words))))
+
+
+def bands(signature):
+    """LSH-корзины: хеш каждых BAND_ROWS значений подписи.
+
+    Тексты со сходством s совпадают хотя бы в одной корзине с
+    вероятностью 1 - (1 - s ** BAND_ROWS) ** BANDS: при пороге 0.7
+    это около 0.985, поэтому кандидатов ищем по индексам на корзинах.
+    10 корзин по 3 значения занимают 30 из 32 значений подписи.
+    """
+    if signature is None:
+        return (None,) * BANDS
+    size = BAND_ROWS * 4
+    return tuple(
+        int.from_bytes(
+            hashlib.blake2b(
+                signature[band * size:(band + 1) * size], digest_size=4
+            ).digest(),
+            'big',
+        ) & 0x7fffffff
+        for band in range(BANDS)
+    )
+
+
+def similarity(first, second):
+    """Оценка коэффициента Жаккара по доле совпавших значений подписей."""
+    return sum(
+        a == b for a, b in zip(SIGNATURE.unpack(first),
+                               SIGNATURE.unpack(second))
+    ) / SIGNATURE_SIZE
+
+
+def set_fingerprint(obj, text):
+    obj.minhash = minhash(text)
+    for field, value in zip(BAND_FIELDS, bands(obj.minhash)):
+        setattr(obj, field, value)
+
+
+def near_duplicates(queryset, text, date_field, exclude_pk=None):
+    """Недавние записи queryset с почти таким же текстом.
+
+    Кандидаты выбираются по совпадению любой корзины, затем
+    отсеиваются по оценке сходства всей подписи.
+    """
+    signature = minhash(text)
+    if signature is None:
+        return []
+    buckets = Q()
+    for field, band in zip(BAND_FIELDS, bands(signature)):
+        buckets |= Q(**{field: band})
+    since = timezone.now() - timedelta(seconds=settings.DUPLICATE_WINDOW)
+    candidates = queryset.filter(
+        buckets, **{f'{date_field}__gte': since}
+    ).exclude(pk=exclude_pk).values_list('pk', 'minhash')
+    return [
+        pk for pk, other in candidates[:settings.DUPLICATE_CANDIDATES]
+        if similarity(signature, bytes(other))
+        >= settings.DUPLICATE_SIMILARITY
+    ]
@@ -1,9 +1,28 @@
 from django import forms
 
-from .models import Post, Comment
+from .fingerprints import near_duplicates
+from .models import Comment, Group, Post
+from .shards import on_shards
+
+DUPLICATE_ERROR = 'Почти такой же текст недавно уже публиковали'
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].queryset = Group.objects.filter(
+            is_deleted=False,
+        )
+
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        if any(
+            near_duplicates(posts, text, 'pub_date', self.instance.pk)
+            for posts in on_shards(Post.objects.all())
+        ):
+            raise forms.ValidationError(DUPLICATE_ERROR)
+        return text
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -18,6 +37,15 @@ class PostForm(forms.ModelForm):
 
 
 class CommentForm(forms.ModelForm):
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        if any(
+            near_duplicates(comments, text, 'created')
+            for comments in on_shards(Comment.objects.all())
+        ):
+            raise forms.ValidationError(DUPLICATE_ERROR)
+        return text
+
     class Meta:
         model = Comment
         fields = ('text',)
@@ -0,0 +1,47 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from posts.renderers import render_text
+
+SAMPLE_TEXT = (
+    'Первая строка поста с <b>разметкой</b> & символами.\n'
+    'Вторая строка поста.\n\n'
+) * 20
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает отрисовку текста фильтром и готовым HTML'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        posts = [
+            {'text': SAMPLE_TEXT, 'text_html': render_text(SAMPLE_TEXT)}
+            for _ in range(options['posts'])
+        ]
+        context = Context({'posts': posts})
+        templates = {
+            'linebreaksbr': Template(
+                '{% for post in posts %}'
+                '<p>{{ post.text|linebreaksbr }}</p>'
+                '{% endfor %}'
+            ),
+            'text_html': Template(
+                '{% for post in posts %}'
+                '<p>{{ post.text_html|safe }}</p>'
+                '{% endfor %}'
+            ),
+        }
+        for name, template in templates.items():
+            seconds = timeit.timeit(
+                lambda: template.render(context),
+                number=options['repeat'],
+            )
+            self.stdout.write(
+                f'{name}: {seconds / options["repeat"] * 1000:.3f} мс '
+                f'на страницу из {options["posts"]} постов'
+            )
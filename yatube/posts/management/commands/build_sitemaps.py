@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Строит карту сайта, перезаписывая только изменившиеся куски'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Перестроить все куски заново',
+        )
+
+    def handle(self, *args, **options):
+        written = build_sitemaps(full=options['full'])
+        for file_name in written:
+            self.stdout.write(file_name)
+        self.stdout.write(f'Перезаписано файлов: {len(written)}')
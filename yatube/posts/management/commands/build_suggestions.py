@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.suggestions import build_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «кого читать» по графу подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int)
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            created = build_suggestions(
+                limit=options['limit'], batch_size=options['batch_size']
+            )
+        except ImportError as error:
+            raise CommandError(
+                f'Для расчёта рекомендаций нужны numpy и scipy: {error}'
+            )
+        self.stdout.write(
+            f'Сохранено рекомендаций: {created} '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
@@ -0,0 +1,97 @@
+from itertools import groupby
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.fingerprints import BAND_FIELDS, set_fingerprint, similarity
+from posts.models import Comment, Post
+from posts.object_cache import forget_posts
+
+
+class Command(BaseCommand):
+    help = 'Находит группы почти одинаковых постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--min-size', type=int, default=2)
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Сначала посчитать подписи у записей без них',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            if options['backfill']:
+                filled = self.backfill(model, options['batch_size'])
+                self.stdout.write(
+                    f'{model.__name__}: посчитано подписей {filled}'
+                )
+            clusters = [
+                cluster for cluster in self.clusters(model)
+                if len(cluster) >= options['min_size']
+            ]
+            self.stdout.write(
+                f'{model.__name__}: групп дубликатов {len(clusters)}'
+            )
+            for cluster in sorted(clusters, key=len, reverse=True):
+                self.stdout.write(
+                    ' '.join(str(pk) for pk in sorted(cluster))
+                )
+
+    def backfill(self, model, batch_size):
+        queryset = model.objects.order_by('pk').filter(
+            minhash__isnull=True
+        ).only('pk', 'text')
+        filled = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return filled
+            for obj in batch:
+                set_fingerprint(obj, obj.text)
+            model.objects.bulk_update(batch, ('minhash',) + BAND_FIELDS)
+            if model is Post:
+                forget_posts(obj.pk for obj in batch)
+            filled += len(batch)
+            last_pk = batch[-1].pk
+
+    @staticmethod
+    def clusters(model):
+        """Связные группы записей со сходством не ниже порога.
+
+        Записи сравниваются только внутри общих корзин по частям
+        подписи, одинаковые подписи склеиваются сразу. Группы
+        собираются через систему непересекающихся множеств.
+        """
+        parents = {}
+
+        def find(pk):
+            while parents.setdefault(pk, pk) != pk:
+                parents[pk] = parents[parents[pk]]
+                pk = parents[pk]
+            return pk
+
+        for field in BAND_FIELDS:
+            rows = model.objects.filter(minhash__isnull=False).order_by(
+                field
+            ).values_list(field, 'pk', 'minhash').iterator()
+            for _, bucket in groupby(rows, key=lambda row: row[0]):
+                exact = {}
+                for _, pk, value in bucket:
+                    parents[find(pk)] = find(
+                        exact.setdefault(bytes(value), pk)
+                    )
+                values = list(exact.items())
+                for index, (value, pk) in enumerate(values):
+                    for other, other_pk in values[index + 1:]:
+                        if (
+                            similarity(value, other)
+                            >= settings.DUPLICATE_SIMILARITY
+                        ):
+                            parents[find(pk)] = find(other_pk)
+        clusters = {}
+        for pk in parents:
+            clusters.setdefault(find(pk), []).append(pk)
+        return list(clusters.values())
@@ -0,0 +1,87 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from core.storage import content_addressed_name, content_digest
+from posts.models import ArchivedPost, Post, image_storage
+from posts.object_cache import forget_posts
+from posts.shards import on_shards
+from posts.signals import image_in_use, release_image
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает картинки постов по хешу, удаляет дубликаты и '
+        'файлы, на которые не ссылается ни один пост'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет сделано',
+        )
+
+    def handle(self, *args, **options):
+        from sorl.thumbnail import delete as delete_thumbnails
+        from sorl.thumbnail.images import ImageFile
+
+        root = os.path.join(settings.MEDIA_ROOT, 'posts')
+        moved = removed = released = freed = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(
+                    path, settings.MEDIA_ROOT
+                ).replace(os.sep, '/')
+                if image_storage.is_content_addressed(name):
+                    if self.unused(name):
+                        self.stdout.write(f'{name} не используется')
+                        size = os.path.getsize(path)
+                        if not options['dry_run'] and release_image(name):
+                            released += 1
+                            freed += size
+                    continue
+                with open(path, 'rb') as image:
+                    target = content_addressed_name(
+                        name, content_digest(File(image))
+                    )
+                duplicate = image_storage.exists(target)
+                self.stdout.write(
+                    f'{name} -> {target}'
+                    + (' (дубликат)' if duplicate else '')
+                )
+                if options['dry_run']:
+                    continue
+                if duplicate:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed += 1
+                else:
+                    os.makedirs(
+                        os.path.dirname(image_storage.path(target)),
+                        exist_ok=True,
+                    )
+                    os.rename(path, image_storage.path(target))
+                    moved += 1
+                for model in (Post, ArchivedPost):
+                    for posts in on_shards(model.objects.filter(image=name)):
+                        ids = list(posts.values_list('pk', flat=True))
+                        posts.update(image=target)
+                        forget_posts(ids)
+                delete_thumbnails(
+                    ImageFile(name, image_storage), delete_file=False
+                )
+        self.stdout.write(
+            f'Переименовано: {moved}, удалено дубликатов: {removed}, '
+            f'неиспользуемых: {released}, освобождено байт: {freed}'
+        )
+
+    @staticmethod
+    def unused(name):
+        """Файл без ссылок, загруженный раньше IMAGE_RELEASE_GRACE."""
+        return not image_storage.saved_within(
+            name, settings.IMAGE_RELEASE_GRACE
+        ) and not image_in_use(name)
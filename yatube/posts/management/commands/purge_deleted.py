@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import PurgeTask
+from posts.purge import run_purge
+
+
+class Command(BaseCommand):
+    help = 'Удаляет скрытых пользователей, группы и посты небольшими пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.PURGE_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=settings.PURGE_PAUSE,
+            help='Пауза между пачками в секундах',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а ждать новые задачи',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Период опроса очереди в режиме --loop',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            tasks = PurgeTask.objects.exclude(status=PurgeTask.DONE)
+            for task in tasks:
+                run_purge(task, options['batch_size'], options['pause'])
+                self.stdout.write(f'{task}: удалено строк {task.removed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,58 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from posts.counters import flush_all
+from posts.models import ArchivedPost, MonthlyPostCount, Post
+from posts.shards import on_shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает помесячные счётчики по видимым постам: без '
+        'скрытых и без постов отключённых авторов'
+    )
+
+    def handle(self, *args, **options):
+        flush_all()
+        totals = Counter()
+        for visible in (
+            Post.objects.filter(is_deleted=False, author__is_active=True),
+            ArchivedPost.objects.filter(author__is_active=True),
+        ):
+            for posts in on_shards(visible):
+                rows = posts.annotate(
+                    year=ExtractYear('pub_date'),
+                    month=ExtractMonth('pub_date'),
+                ).values('author_id', 'group_id', 'year', 'month').annotate(
+                    total=Count('id')
+                ).order_by()
+                for row in rows.iterator():
+                    date = (row['year'], row['month'])
+                    totals[(MonthlyPostCount.ALL, 0, *date)] += row['total']
+                    totals[(
+                        MonthlyPostCount.AUTHOR, row['author_id'], *date
+                    )] += row['total']
+                    if row['group_id']:
+                        totals[(
+                            MonthlyPostCount.GROUP, row['group_id'], *date
+                        )] += row['total']
+        with transaction.atomic():
+            MonthlyPostCount.objects.all().delete()
+            MonthlyPostCount.objects.bulk_create(
+                [
+                    MonthlyPostCount(
+                        scope=scope,
+                        scope_id=scope_id,
+                        year=year,
+                        month=month,
+                        count=count,
+                    )
+                    for (scope, scope_id, year, month), count in totals.items()
+                ],
+                batch_size=500,
+            )
+        self.stdout.write(f'Счётчиков пересчитано: {len(totals)}')
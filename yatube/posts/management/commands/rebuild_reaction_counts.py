@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Post, PostReactionCount, Reaction
+from posts.shards import on_shards
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики реакций постов по таблице реакций. '
+        'Счётчики архивных постов не трогаются: их реакции удалены '
+        'при переносе в архив.'
+    )
+
+    def handle(self, *args, **options):
+        rebuilt = 0
+        for posts in on_shards(Post.objects.order_by('pk')):
+            ids = list(posts.values_list('pk', flat=True))
+            for start in range(0, len(ids), BATCH_SIZE):
+                rebuilt += self.rebuild(
+                    posts.db, ids[start:start + BATCH_SIZE]
+                )
+        self.stdout.write(f'Счётчиков пересчитано: {rebuilt}')
+
+    @staticmethod
+    def rebuild(alias, ids):
+        """Заменяет счётчики пачки постов посчитанными по реакциям."""
+        counts = [
+            PostReactionCount(
+                post_id=row['post_id'], kind=row['kind'], count=row['total']
+            )
+            for row in Reaction.objects.using(alias).filter(
+                post_id__in=ids
+            ).values('post_id', 'kind').annotate(
+                total=Count('id')
+            ).order_by()
+        ]
+        with transaction.atomic():
+            PostReactionCount.objects.filter(post_id__in=ids).delete()
+            PostReactionCount.objects.bulk_create(counts)
+        return len(counts)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+from posts.object_cache import forget_posts
+from posts.renderers import render_text
+
+
+class Command(BaseCommand):
+    help = 'Заполняет готовый HTML текста у существующих постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перерисовать все записи, например после смены рендерера',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment, ArchivedPost, ArchivedComment):
+            rendered = self.backfill(
+                model, options['batch_size'], options['all']
+            )
+            self.stdout.write(f'{model.__name__}: обновлено {rendered}')
+
+    def backfill(self, model, batch_size, render_all):
+        queryset = model.objects.order_by('pk').only('pk', 'text')
+        if not render_all:
+            queryset = queryset.filter(text_html='')
+        rendered = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return rendered
+            for obj in batch:
+                obj.text_html = render_text(obj.text)
+            model.objects.bulk_update(batch, ['text_html'])
+            if model in (Post, ArchivedPost):
+                forget_posts(obj.pk for obj in batch)
+            rendered += len(batch)
+            last_pk = batch[-1].pk
@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from posts.counters import flush_all
+from posts.feeds import bump_feed_version
+from posts.models import ArchivedPost, Group, Post, User
+from posts.object_cache import forget_posts
+from posts.shards import move_author, replicate, shard_for
+
+
+class Command(BaseCommand):
+    help = 'Переносит авторов с их постами на другой шард без остановки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('shard', help='Шард из POST_SHARDS')
+        parser.add_argument('usernames', nargs='*')
+        parser.add_argument(
+            '--sync-replicas',
+            action='store_true',
+            help='Сначала скопировать на шард всех пользователей и группы',
+        )
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        shard = options['shard']
+        if shard not in settings.POST_SHARDS:
+            raise CommandError(
+                f'Шарда {shard} нет в POST_SHARDS: {settings.POST_SHARDS}'
+            )
+        batch_size = options['batch_size'] or settings.SHARD_MOVE_BATCH_SIZE
+        if options['sync_replicas'] and shard != DEFAULT_DB_ALIAS:
+            for model in (User, Group):
+                copied = self.sync_replicas(model, shard, batch_size)
+                self.stdout.write(f'{model.__name__}: скопировано {copied}')
+        authors = User.objects.filter(username__in=options['usernames'])
+        missing = set(options['usernames']) - {
+            author.username for author in authors
+        }
+        if missing:
+            raise CommandError(
+                f'Нет пользователей: {", ".join(sorted(missing))}'
+            )
+        for author in authors:
+            source = shard_for(author.pk)
+            started = time.perf_counter()
+            written = move_author(author.pk, shard, batch_size)
+            for model in (Post, ArchivedPost):
+                forget_posts(model.objects.using(shard).filter(
+                    author=author
+                ).values_list('pk', flat=True))
+            self.stdout.write(
+                f'{author.username}: {source} -> {shard}, '
+                f'записано строк {written} '
+                f'за {time.perf_counter() - started:.1f} с'
+            )
+        if options['usernames']:
+            bump_feed_version()
+        flush_all()
+
+    @staticmethod
+    def sync_replicas(model, shard, batch_size):
+        copied = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')[
+                    :batch_size
+                ]
+            )
+            if not batch:
+                return copied
+            replicate(model, batch, [shard])
+            copied += len(batch)
+            last_pk = batch[-1].pk
@@ -0,0 +1,171 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client
+from django.urls import reverse
+
+from core.cache import cache_is_shared
+from posts.models import Group, Post, User
+
+THUMBNAIL_GEOMETRY = '960x339'
+
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+class Command(BaseCommand):
+    """Страницы прогреваются только при общем для процессов кеше.
+
+    С LocMemCache записи живут в памяти самой команды и исчезают при
+    её завершении, поэтому прогреваются одни миниатюры: их файлы и
+    записи sorl лежат на диске и в базе. Из страниц кешируется только
+    фрагмент главной, и только его гостевой вариант: страницы групп и
+    профилей открывать незачем, для них готовятся лишь миниатюры.
+    """
+
+    help = (
+        'Прогревает кеш фрагмента главной для гостей и миниатюры '
+        'главной, популярных групп и авторов. Страницы групп и профилей '
+        'ничего не кешируют и не открываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--index-pages', type=int, default=3)
+        parser.add_argument(
+            '--groups',
+            type=int,
+            default=10,
+            help='Сколько популярных групп взять для миниатюр',
+        )
+        parser.add_argument(
+            '--authors',
+            type=int,
+            default=10,
+            help='Сколько популярных авторов взять для миниатюр',
+        )
+        parser.add_argument(
+            '--urls-file',
+            help=(
+                'Файл со списком страниц главной, например из журнала '
+                'доступа; другие адреса пропускаются'
+            ),
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=60,
+            help='Ограничение по времени в секундах',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deadline = started + options['budget']
+        if cache_is_shared():
+            urls = self.hot_urls(options)
+            self.stdout.write(f'Страниц главной для прогрева: {len(urls)}')
+            done = self.render(urls, options['workers'], deadline)
+        else:
+            urls = []
+            done = 0
+            self.stdout.write(
+                'Кеш не общий для процессов, страницы не прогреваются'
+            )
+        thumbnails = self.thumbnails(options, deadline)
+        self.stdout.write(
+            f'Готово: страниц главной {done} из {len(urls)}, '
+            f'миниатюр {thumbnails}, '
+            f'{time.monotonic() - started:.1f} с'
+        )
+
+    def hot_urls(self, options):
+        index = reverse('posts:index')
+        urls = [
+            index + (f'?page={page}' if page > 1 else '')
+            for page in range(1, options['index_pages'] + 1)
+        ]
+        if options['urls_file']:
+            with open(options['urls_file'], encoding='utf-8') as urls_file:
+                urls += [
+                    url for url in map(str.strip, urls_file)
+                    if url == index or url.startswith(index + '?')
+                ]
+        return list(dict.fromkeys(urls))
+
+    @staticmethod
+    def top_groups(limit):
+        return Group.objects.filter(is_deleted=False).annotate(
+            posts_count=Count('posts', filter=Q(posts__is_deleted=False)),
+        ).order_by('-posts_count').values_list('slug', flat=True)[:limit]
+
+    @staticmethod
+    def top_authors(limit):
+        return User.objects.filter(is_active=True).annotate(
+            posts_count=Count('posts', filter=Q(posts__is_deleted=False)),
+        ).order_by('-posts_count').values_list('username', flat=True)[:limit]
+
+    def render(self, urls, workers, deadline):
+        if workers <= 1:
+            return sum(
+                self.fetch(url) for url in urls
+                if time.monotonic() < deadline
+            )
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.fetch_in_thread, url, deadline)
+                for url in urls
+            ]
+            for future in as_completed(futures):
+                done += future.result()
+        return done
+
+    def fetch_in_thread(self, url, deadline):
+        if time.monotonic() >= deadline:
+            return False
+        try:
+            return self.fetch(url)
+        finally:
+            connection.close()
+
+    def fetch(self, url):
+        started = time.monotonic()
+        response = Client().get(url)
+        self.stdout.write(
+            f'{response.status_code} {url} '
+            f'{(time.monotonic() - started) * 1000:.0f} мс'
+        )
+        return response.status_code == 200
+
+    def thumbnails(self, options, deadline):
+        from sorl.thumbnail import get_thumbnail
+
+        posts = Post.objects.visible().exclude(image='').filter(
+            Q(pk__in=Post.objects.visible().values('pk')[
+                :options['index_pages'] * settings.POST_ON_PAGE
+            ])
+            | Q(group__slug__in=list(self.top_groups(options['groups'])))
+            | Q(author__username__in=list(
+                self.top_authors(options['authors'])
+            ))
+        ).only('id', 'image')
+        seen = set()
+        generated = 0
+        for post in posts.iterator():
+            if time.monotonic() >= deadline:
+                break
+            if post.image.name in seen:
+                continue
+            seen.add(post.image.name)
+            try:
+                get_thumbnail(
+                    post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+                )
+            except Exception as error:
+                self.stderr.write(f'{post.image.name}: {error}')
+                continue
+            generated += 1
+        return generated
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_auto_20261019_0735'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_auto_20261019_0735'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurgeTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('group', 'Группа'), ('post', 'Пост')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершено')], db_index=True, default='pending', max_length=10)),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created'],
+            },
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20261019_0736'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
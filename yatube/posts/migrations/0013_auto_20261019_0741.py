@@ -0,0 +1,24 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:41
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_auto_20261019_0737'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedpost',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Image'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Image'),
+        ),
+    ]
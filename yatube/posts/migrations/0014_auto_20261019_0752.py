@@ -0,0 +1,44 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_auto_20261019_0741'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupFollow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_feed'),
+        ),
+        migrations.AddField(
+            model_name='groupfollow',
+            name='group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to='posts.Group'),
+        ),
+        migrations.AddField(
+            model_name='groupfollow',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_following', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='groupfollow',
+            constraint=models.UniqueConstraint(fields=('user', 'group'), name='unique_group_follower'),
+        ),
+    ]
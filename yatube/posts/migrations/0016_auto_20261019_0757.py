@@ -0,0 +1,63 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_auto_20261019_0754'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_0',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_1',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_2',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_3',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_0',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_1',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_2',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_3',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 2.2.19 on 2026-10-19 07:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_paths(apps, schema_editor):
+    for model_name in ('Comment', 'ArchivedComment'):
+        model = apps.get_model('posts', model_name)
+        batch = []
+        for comment in model.objects.filter(path='').only('pk').iterator():
+            comment.path = f'{comment.pk:010d}'
+            batch.append(comment)
+            if len(batch) == 500:
+                model.objects.bulk_update(batch, ['path'])
+                batch = []
+        model.objects.bulk_update(batch, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_auto_20261019_0757'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.ArchivedComment'),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'path'], name='archived_comment_thread'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_thread'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
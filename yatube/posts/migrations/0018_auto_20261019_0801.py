@@ -0,0 +1,43 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_auto_20261019_0759'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostReactionCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('like', '👍'), ('love', '❤️'), ('laugh', '😂')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', '👍'), ('love', '❤️'), ('laugh', '😂')], max_length=10)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postreactioncount',
+            constraint=models.UniqueConstraint(fields=('post_id', 'kind'), name='unique_reaction_count'),
+        ),
+        migrations.AddConstraint(
+            model_name='reaction',
+            constraint=models.UniqueConstraint(fields=('user', 'post', 'kind'), name='unique_reaction'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_auto_20261019_0801'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
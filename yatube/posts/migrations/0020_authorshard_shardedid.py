@@ -0,0 +1,30 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_auto_20261019_0804'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardedId',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuthorShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.CharField(max_length=100)),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='shard', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
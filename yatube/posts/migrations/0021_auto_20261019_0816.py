@@ -0,0 +1,35 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_authorshard_shardedid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPostCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'Весь сайт'), ('group', 'Группа'), ('author', 'Автор')], max_length=10)),
+                ('scope_id', models.PositiveIntegerField(default=0)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['-pub_date', '-id'], name='archived_post_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypostcount',
+            constraint=models.UniqueConstraint(fields=('scope', 'scope_id', 'year', 'month'), name='unique_month_count'),
+        ),
+    ]
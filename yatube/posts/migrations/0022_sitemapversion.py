@@ -0,0 +1,26 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_auto_20261019_0816'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SitemapVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(max_length=20)),
+                ('chunk', models.PositiveIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sitemapversion',
+            constraint=models.UniqueConstraint(fields=('section', 'chunk'), name='unique_sitemap_chunk'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_sitemapversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purgetask',
+            name='kind',
+            field=models.CharField(choices=[('user', 'Пользователь'), ('group', 'Группа'), ('post', 'Пост'), ('comment', 'Комментарий')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:56
+
+import hashlib
+
+from django.db import migrations, models
+
+BAND_SIZE = 3 * 4
+
+NEW_BANDS = range(4, 10)
+
+
+def fill_bands(apps, schema_editor):
+    """Корзины 4-9 по уже сохранённым подписям, как в fingerprints.bands."""
+    alias = schema_editor.connection.alias
+    fields = [f'minhash_band_{band}' for band in NEW_BANDS]
+    for model_name in ('Post', 'Comment'):
+        model = apps.get_model('posts', model_name)
+        batch = []
+        rows = model.objects.using(alias).filter(
+            minhash__isnull=False
+        ).only('pk', 'minhash')
+        for obj in rows.iterator():
+            signature = bytes(obj.minhash)
+            for band, field in zip(NEW_BANDS, fields):
+                digest = hashlib.blake2b(
+                    signature[band * BAND_SIZE:(band + 1) * BAND_SIZE],
+                    digest_size=4,
+                ).digest()
+                setattr(obj, field, int.from_bytes(digest, 'big') & 0x7fffffff)
+            batch.append(obj)
+            if len(batch) == 500:
+                model.objects.using(alias).bulk_update(batch, fields)
+                batch = []
+        model.objects.using(alias).bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_purgetask_comment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_4',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_5',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_6',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_7',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_8',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='minhash_band_9',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_4',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_5',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_6',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_7',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_8',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='minhash_band_9',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_bands, migrations.RunPython.noop),
+    ]
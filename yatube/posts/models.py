@@ -1,14 +1,36 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F
 from django.db.models.constraints import UniqueConstraint
 
+from core.storage import ContentAddressedStorage
+
+from .fingerprints import set_fingerprint
+from .renderers import render_text
+
 User = get_user_model()
 
+image_storage = ContentAddressedStorage()
+
+
+class VisibleQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """Без явного using сохраняет объект на его шард, а не в default."""
+        if self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
+
+    def visible(self):
+        return self.filter(is_deleted=False, author__is_active=True)
+
 
 class Post(models.Model):
     text = models.TextField()
-    pub_date = models.DateTimeField(auto_now_add=True)
+    text_html = models.TextField(blank=True, editable=False)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -24,25 +46,82 @@ class Post(models.Model):
     image = models.ImageField(
         'Image',
         upload_to='posts/',
+        storage=image_storage,
         blank=True,
+        db_index=True,
+    )
+    views = models.PositiveIntegerField(default=0, editable=False)
+    minhash = models.BinaryField(blank=True, null=True)
+    minhash_band_0 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_1 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_2 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_3 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_4 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_5 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
     )
+    minhash_band_6 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_7 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_8 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_9 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    is_deleted = models.BooleanField(default=False)
+
+    objects = VisibleQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_STR_LENGTH]
 
+    def save(self, *args, **kwargs):
+        self.text_html = render_text(self.text)
+        set_fingerprint(self, self.text)
+        super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    is_deleted = models.BooleanField(default=False)
 
     def __str__(self):
         return self.title
 
 
+def thread_segment(pk):
+    return f'{pk:010d}'
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         'Post',
@@ -54,15 +133,98 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments',
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+    )
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    text_html = models.TextField(blank=True, editable=False)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    minhash = models.BinaryField(blank=True, null=True)
+    minhash_band_0 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_1 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_2 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_3 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_4 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_5 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_6 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_7 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_8 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    minhash_band_9 = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+    )
+    is_deleted = models.BooleanField(default=False)
+
+    objects = VisibleQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', 'path'], name='comment_thread'),
+        ]
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        self.text_html = render_text(self.text)
+        set_fingerprint(self, self.text)
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        using = kwargs.get('using') or router.db_for_write(
+            Comment, instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            self.place_in_thread()
+
+    def place_in_thread(self):
+        """Заполняет путь и глубину, увеличивает счётчики у предков.
+
+        Путь - id предков и самого комментария через «/», дополненные
+        нулями, поэтому сортировка по пути даёт порядок дерева. Ответ
+        глубже COMMENT_MAX_DEPTH прикрепляется к предку на последнем
+        допустимом уровне.
+        """
+        ancestors = self.parent.path.split('/') if self.parent_id else []
+        ancestors = ancestors[:settings.COMMENT_MAX_DEPTH]
+        if ancestors:
+            self.parent_id = int(ancestors[-1])
+        self.depth = len(ancestors)
+        self.path = '/'.join(ancestors + [thread_segment(self.pk)])
+        comments = Comment.objects.using(self._state.db)
+        comments.filter(pk=self.pk).update(
+            parent_id=self.parent_id, depth=self.depth, path=self.path,
+        )
+        comments.filter(pk__in=ancestors).update(
+            reply_count=F('reply_count') + 1
+        )
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -81,3 +243,273 @@ class Follow(models.Model):
             UniqueConstraint(fields=['user', 'author'],
                              name='unique_follower&following'),
         ]
+
+
+class Reaction(models.Model):
+    LIKE = 'like'
+    LOVE = 'love'
+    LAUGH = 'laugh'
+    KIND_CHOICES = (
+        (LIKE, '👍'),
+        (LOVE, '❤️'),
+        (LAUGH, '😂'),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['user', 'post', 'kind'],
+                             name='unique_reaction'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.get_kind_display()} {self.post_id}'
+
+
+class PostReactionCount(models.Model):
+    post_id = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=Reaction.KIND_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['post_id', 'kind'],
+                             name='unique_reaction_count'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} {self.get_kind_display()}: {self.count}'
+
+
+class MonthlyPostCount(models.Model):
+    ALL = 'all'
+    GROUP = 'group'
+    AUTHOR = 'author'
+    SCOPE_CHOICES = (
+        (ALL, 'Весь сайт'),
+        (GROUP, 'Группа'),
+        (AUTHOR, 'Автор'),
+    )
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_id = models.PositiveIntegerField(default=0)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        constraints = [
+            UniqueConstraint(fields=['scope', 'scope_id', 'year', 'month'],
+                             name='unique_month_count'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope} {self.scope_id} {self.month:02d}.{self.year}'
+
+
+class FollowSuggestion(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='suggestion_user_score',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_following',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+    )
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['user', 'group'],
+                             name='unique_group_follower'),
+        ]
+
+
+class ArchivedPost(models.Model):
+    text = models.TextField()
+    text_html = models.TextField(blank=True, editable=False)
+    pub_date = models.DateTimeField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+    )
+    group = models.ForeignKey(
+        'Group',
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+    )
+    image = models.ImageField(
+        'Image',
+        upload_to='posts/',
+        storage=image_storage,
+        blank=True,
+        db_index=True,
+    )
+    views = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='archived_post_author_date'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='archived_post_date'),
+        ]
+
+    def __str__(self):
+        return self.text[:settings.POST_STR_LENGTH]
+
+
+class ArchivedComment(models.Model):
+    post = models.ForeignKey(
+        'ArchivedPost',
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+    )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+    )
+    path = models.CharField(max_length=255, blank=True)
+    depth = models.PositiveSmallIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)
+    text = models.TextField()
+    text_html = models.TextField(blank=True, editable=False)
+    created = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', 'path'], name='archived_comment_thread',
+            ),
+        ]
+
+    def __str__(self):
+        return self.text
+
+
+class PurgeTask(models.Model):
+    USER = 'user'
+    GROUP = 'group'
+    POST = 'post'
+    COMMENT = 'comment'
+    KIND_CHOICES = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершено'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        db_index=True,
+    )
+    removed = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}'
+
+
+class AuthorShard(models.Model):
+    """Шард автора, назначенный вручную вместо шарда по его id."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shard',
+    )
+    shard = models.CharField(max_length=100)
+
+    def __str__(self):
+        return f'{self.author} -> {self.shard}'
+
+
+class ShardedId(models.Model):
+    """Последовательность id постов и комментариев, общая для шардов."""
+
+
+class SitemapVersion(models.Model):
+    """Версия куска карты сайта, которую не видно по числу строк.
+
+    Растёт при переименовании пользователя или группы: адрес в карте
+    меняется, а число строк и максимальный id куска - нет.
+    """
+
+    section = models.CharField(max_length=20)
+    chunk = models.PositiveIntegerField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['section', 'chunk'],
+                             name='unique_sitemap_chunk'),
+        ]
+
+    def __str__(self):
+        return f'{self.section} {self.chunk}: {self.version}'
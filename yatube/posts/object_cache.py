@@ -0,0 +1,77 @@
+from django.http import Http404
+
+from core.cache import ObjectCache
+
+from .models import ArchivedPost, Group, Post, User
+from .shards import get_sharded
+
+
+def _load_group(field, value):
+    return Group.objects.filter(**{field: value}).first()
+
+
+def _load_user(field, value):
+    """Пользователь без хеша пароля: он не нужен для показа автора."""
+    return User.objects.defer('password').filter(**{field: value}).first()
+
+
+def _load_post(field, value):
+    """Пост или, если его уже перенесли, архивный пост с тем же id.
+
+    Просмотры меняются постоянно, поэтому в кеш они не попадают:
+    страница поста дочитывает их отдельно.
+    """
+    for model in (Post, ArchivedPost):
+        try:
+            return get_sharded(
+                model.objects.defer('views'), **{field: value}
+            )
+        except model.DoesNotExist:
+            continue
+    return None
+
+
+groups = ObjectCache('group', _load_group, ('pk', 'slug'))
+
+users = ObjectCache('user', _load_user, ('pk', 'username'))
+
+posts = ObjectCache('post', _load_post)
+
+OBJECT_CACHES = {Group: groups, User: users, Post: posts, ArchivedPost: posts}
+
+
+def get_group_or_404(slug):
+    group = groups.get('slug', slug)
+    if group is None or group.is_deleted:
+        raise Http404
+    return group
+
+
+def get_author_or_404(username, active=True):
+    author = users.get('username', username)
+    if author is None or (active and not author.is_active):
+        raise Http404
+    return author
+
+
+def get_post_or_404(post_id, archived=False):
+    """Видимый пост с автором и группой из их кешей.
+
+    Архивный пост возвращается только при archived=True.
+    """
+    post = posts.get('pk', post_id)
+    if post is None or (isinstance(post, ArchivedPost) and not archived):
+        raise Http404
+    if isinstance(post, Post) and post.is_deleted:
+        raise Http404
+    author = users.get('pk', post.author_id)
+    if author is None or not author.is_active:
+        raise Http404
+    post.author = author
+    if post.group_id is not None:
+        post.group = groups.get('pk', post.group_id)
+    return post
+
+
+def forget_posts(ids, using=None):
+    posts.forget('pk', list(ids), using)
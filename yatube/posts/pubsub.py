@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+class Subscription:
+    """Очередь уведомлений одного подключения с ограниченной длиной.
+
+    Если клиент не успевает читать, старые сообщения вытесняются,
+    а флаг overflowed подсказывает клиенту перезагрузить ленту.
+    """
+
+    def __init__(self, broker, channels, maxlen):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.queue = deque(maxlen=maxlen)
+        self.overflowed = False
+        self.condition = threading.Condition()
+
+    def put(self, message):
+        with self.condition:
+            if len(self.queue) == self.queue.maxlen:
+                self.overflowed = True
+            self.queue.append(message)
+            self.condition.notify()
+
+    def get(self, timeout):
+        with self.condition:
+            if not self.queue:
+                self.condition.wait(timeout)
+            messages = list(self.queue)
+            self.queue.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        return messages, overflowed
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Публикация уведомлений о новых постах внутри процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def subscribe(self, channels, maxlen=None):
+        subscription = Subscription(
+            self, channels, maxlen or settings.FEED_STREAM_BUFFER
+        )
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, channels, message):
+        channels = set(channels)
+        with self.lock:
+            subscriptions = [
+                subscription for subscription in self.subscriptions
+                if subscription.channels & channels
+            ]
+        for subscription in subscriptions:
+            subscription.put(message)
+
+
+broker = Broker()
+
+
+def post_channels(post):
+    channels = ['index', f'author:{post.author_id}']
+    if post.group_id:
+        channels.append(f'group:{post.group_id}')
+    return channels
+
+
+def event_stream(channels, backlog=()):
+    """Поток server-sent events с уведомлениями о новых постах."""
+    subscription = broker.subscribe(channels)
+    deadline = time.monotonic() + settings.FEED_STREAM_LIFETIME
+    try:
+        yield 'retry: 3000\n\n'
+        for message in backlog:
+            yield format_event(message)
+        while time.monotonic() < deadline:
+            messages, overflowed = subscription.get(
+                settings.FEED_STREAM_HEARTBEAT
+            )
+            if overflowed:
+                yield 'event: reset\ndata: {}\n\n'
+            for message in messages:
+                yield format_event(message)
+            if not messages and not overflowed:
+                yield ': ping\n\n'
+    finally:
+        subscription.close()
+
+
+def format_event(message):
+    return f'id: {message["cursor"]}\ndata: {json.dumps(message)}\n\n'
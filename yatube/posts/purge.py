@@ -0,0 +1,155 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import flush_all
+from .feeds import bump_feed_version
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                     FollowSuggestion, Group, GroupFollow, MonthlyPostCount,
+                     Post, PostReactionCount, PurgeTask, Reaction, User)
+from .months import count_author_posts, count_post
+from .object_cache import OBJECT_CACHES
+from .shards import SHARDED_MODELS, on_shards, replicate
+
+MONTH_SCOPES = {
+    PurgeTask.GROUP: MonthlyPostCount.GROUP,
+    PurgeTask.USER: MonthlyPostCount.AUTHOR,
+}
+
+
+def schedule_purge(obj):
+    """Сразу скрывает объект и ставит его удаление в очередь.
+
+    Скрытый пост и посты отключённого автора сразу вычитаются из
+    помесячных счётчиков, как если бы их уже удалили.
+    """
+    if isinstance(obj, Post):
+        hidden = Post.objects.using(obj._state.db).filter(
+            pk=obj.pk, is_deleted=False,
+        ).update(is_deleted=True)
+        if hidden and obj.author.is_active:
+            count_post(obj, -1)
+        kind = PurgeTask.POST
+    elif isinstance(obj, Comment):
+        Comment.objects.using(obj._state.db).filter(pk=obj.pk).update(
+            is_deleted=True
+        )
+        kind = PurgeTask.COMMENT
+    elif isinstance(obj, Group):
+        Group.objects.filter(pk=obj.pk).update(is_deleted=True)
+        replicate(Group, Group.objects.filter(pk=obj.pk))
+        kind = PurgeTask.GROUP
+    elif isinstance(obj, User):
+        if User.objects.filter(pk=obj.pk, is_active=True).update(
+            is_active=False
+        ):
+            count_author_posts(obj.pk, -1)
+        replicate(User, User.objects.filter(pk=obj.pk))
+        kind = PurgeTask.USER
+    else:
+        raise TypeError(f'Нельзя удалить в фоне объект {obj!r}')
+    if type(obj) in OBJECT_CACHES:
+        OBJECT_CACHES[type(obj)].forget_object(obj)
+    bump_feed_version()
+    return PurgeTask.objects.get_or_create(
+        kind=kind,
+        object_id=obj.pk,
+        status=PurgeTask.PENDING,
+    )[0]
+
+
+def _purge_steps(task):
+    """Шаги удаления: пары (queryset, обновление или None для удаления).
+
+    Счётчики реакций удаляются вместе с каждой пачкой постов.
+    """
+    pk = task.object_id
+    if task.kind == PurgeTask.POST:
+        return [
+            (Comment.objects.filter(post_id=pk), None),
+            (Reaction.objects.filter(post_id=pk), None),
+            (Post.objects.filter(pk=pk), None),
+        ]
+    if task.kind == PurgeTask.COMMENT:
+        return [(Comment.objects.filter(pk=pk), None)]
+    if task.kind == PurgeTask.GROUP:
+        return [
+            (GroupFollow.objects.filter(group_id=pk), None),
+            (Post.objects.filter(group_id=pk), {'group': None}),
+            (ArchivedPost.objects.filter(group_id=pk), {'group': None}),
+            (Group.objects.filter(pk=pk), None),
+        ]
+    return [
+        (Comment.objects.filter(author_id=pk), None),
+        (Comment.objects.filter(post__author_id=pk), None),
+        (ArchivedComment.objects.filter(author_id=pk), None),
+        (ArchivedComment.objects.filter(post__author_id=pk), None),
+        (Reaction.objects.filter(user_id=pk), None),
+        (Reaction.objects.filter(post__author_id=pk), None),
+        (Post.objects.filter(author_id=pk), None),
+        (ArchivedPost.objects.filter(author_id=pk), None),
+        (Follow.objects.filter(Q(user_id=pk) | Q(author_id=pk)), None),
+        (GroupFollow.objects.filter(user_id=pk), None),
+        (FollowSuggestion.objects.filter(
+            Q(user_id=pk) | Q(author_id=pk)
+        ), None),
+        (User.objects.filter(pk=pk), None),
+    ]
+
+
+def _run_step(task, queryset, changes, batch_size, pause):
+    """Обрабатывает queryset пачками.
+
+    Удаляемые посты уже вычтены из помесячных счётчиков при скрытии,
+    поэтому вычитание сигнала post_delete сразу гасится в буфере.
+    """
+    model = queryset.model
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        batch = model.objects.using(queryset.db).filter(pk__in=ids)
+        hidden = []
+        if changes is None and model in (Post, ArchivedPost):
+            hidden = list(batch.only('pub_date', 'author_id', 'group_id'))
+        with transaction.atomic(using=queryset.db):
+            if changes is None:
+                batch.delete()
+            else:
+                batch.update(**changes)
+        for post in hidden:
+            count_post(post, 1)
+        if model in OBJECT_CACHES:
+            OBJECT_CACHES[model].forget('pk', ids)
+        if changes is None and model in (Post, ArchivedPost):
+            PostReactionCount.objects.filter(post_id__in=ids).delete()
+        task.removed += len(ids)
+        task.save(update_fields=['removed'])
+        time.sleep(pause)
+
+
+def run_purge(task, batch_size=None, pause=None):
+    """Удаляет строки задачи небольшими пачками с паузами между ними."""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_PAUSE if pause is None else pause
+    task.status = PurgeTask.RUNNING
+    task.save(update_fields=['status'])
+    for queryset, changes in _purge_steps(task):
+        if queryset.model in SHARDED_MODELS:
+            shard_querysets = on_shards(queryset)
+        else:
+            shard_querysets = [queryset]
+        for shard_queryset in shard_querysets:
+            _run_step(task, shard_queryset, changes, batch_size, pause)
+    if task.kind in MONTH_SCOPES:
+        MonthlyPostCount.objects.filter(
+            scope=MONTH_SCOPES[task.kind], scope_id=task.object_id,
+        ).delete()
+    flush_all()
+    task.status = PurgeTask.DONE
+    task.finished = timezone.now()
+    task.save(update_fields=['status', 'finished'])
+    return task
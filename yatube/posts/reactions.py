@@ -0,0 +1,79 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .counters import BufferedCounter
+from .models import Post, PostReactionCount, Reaction
+
+
+def write_counts(deltas):
+    """Прибавляет накопленные дельты к счётчикам одной транзакцией."""
+    with transaction.atomic():
+        for (post_id, kind), delta in sorted(deltas.items()):
+            counts = PostReactionCount.objects.filter(
+                post_id=post_id, kind=kind
+            )
+            if counts.update(count=F('count') + delta) or delta < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    PostReactionCount.objects.create(
+                        post_id=post_id, kind=kind, count=delta
+                    )
+            except IntegrityError:
+                counts.update(count=F('count') + delta)
+
+
+reaction_counter = BufferedCounter('reactions', write_counts)
+
+
+def toggle_reaction(user, post, kind):
+    """Ставит реакцию или снимает уже поставленную."""
+    deleted, _ = post.reactions.filter(user=user, kind=kind).delete()
+    if not deleted:
+        post.reactions.get_or_create(user=user, kind=kind)
+
+
+def attach_reactions(posts, user=None):
+    """Добавляет постам страницы счётчики и реакции пользователя.
+
+    Два запроса на всю страницу независимо от числа постов, свои
+    реакции при нескольких шардах - по запросу на шард. Без
+    пользователя, например для общего кеша главной, свои реакции не
+    подсвечиваются.
+    """
+    posts = list(posts)
+    ids = [post.id for post in posts]
+    counts = dict.fromkeys(
+        ((post_id, kind) for post_id in ids
+         for kind, _ in Reaction.KIND_CHOICES),
+        0,
+    )
+    for post_id, kind, count in PostReactionCount.objects.filter(
+        post_id__in=ids
+    ).values_list('post_id', 'kind', 'count'):
+        counts[post_id, kind] = count
+    mine = set()
+    if user is not None and user.is_authenticated:
+        shards = {}
+        for post in posts:
+            shards.setdefault(post._state.db, []).append(post.id)
+        for alias, shard_ids in shards.items():
+            mine.update(Reaction.objects.using(alias).filter(
+                user=user, post_id__in=shard_ids
+            ).values_list('post_id', 'kind'))
+    for post in posts:
+        post.reactable = isinstance(post, Post)
+        post.reaction_counts = [
+            {
+                'kind': kind,
+                'label': label,
+                'count': max(
+                    counts[post.id, kind]
+                    + reaction_counter.pending_delta((post.id, kind)),
+                    0,
+                ),
+                'mine': (post.id, kind) in mine,
+            }
+            for kind, label in Reaction.KIND_CHOICES
+        ]
+    return posts
@@ -0,0 +1,24 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.defaultfilters import linebreaksbr
+from django.utils.module_loading import import_string
+
+
+def linebreaks_renderer(text):
+    """Экранирует текст и заменяет переводы строк на <br>."""
+    return linebreaksbr(text, autoescape=True)
+
+
+@lru_cache(maxsize=None)
+def get_renderer(path):
+    return import_string(path)
+
+
+def render_text(text):
+    """Готовит безопасный HTML текста поста или комментария.
+
+    Рендерер задаётся настройкой POST_TEXT_RENDERER: это функция,
+    которая принимает исходный текст и возвращает экранированный HTML.
+    """
+    return get_renderer(settings.POST_TEXT_RENDERER)(text)
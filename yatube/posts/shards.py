@@ -0,0 +1,367 @@
+import heapq
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Max
+from django.http import Http404
+
+from .models import (ArchivedComment, ArchivedPost, AuthorShard, Comment,
+                     Post, Reaction, ShardedId, User)
+
+SHARDED_MODELS = (Post, Comment, Reaction, ArchivedPost, ArchivedComment)
+
+AUTHOR_MODELS = (Post, ArchivedPost)
+
+
+def is_sharded():
+    return len(settings.POST_SHARDS) > 1
+
+
+def replica_aliases():
+    """Шарды, на которые копируются пользователи и группы из default."""
+    return [
+        alias for alias in settings.POST_SHARDS if alias != DEFAULT_DB_ALIAS
+    ]
+
+
+_shard_map = {'authors': None, 'loaded': 0.0}
+
+
+def assigned_shards():
+    """Карта {автор: шард} из AuthorShard, закешированная в процессе.
+
+    Карта перечитывается раз в SHARD_MAP_TTL секунд; перенос автора
+    ждёт столько же, прежде чем дописать последние строки. Внутри
+    транзакции карта читается из базы, как её видит транзакция.
+    """
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return dict(AuthorShard.objects.values_list('author_id', 'shard'))
+    now = time.monotonic()
+    if (
+        _shard_map['authors'] is None
+        or now - _shard_map['loaded'] >= settings.SHARD_MAP_TTL
+    ):
+        _shard_map['authors'] = dict(
+            AuthorShard.objects.values_list('author_id', 'shard')
+        )
+        _shard_map['loaded'] = now
+    return _shard_map['authors']
+
+
+def forget_shard_map():
+    _shard_map['authors'] = None
+
+
+def shard_for(author_id):
+    """Шард постов автора: назначенный вручную или по остатку от id."""
+    shards = settings.POST_SHARDS
+    if len(shards) == 1:
+        return shards[0]
+    assigned = assigned_shards().get(author_id)
+    return assigned or shards[author_id % len(shards)]
+
+
+def on_shards(queryset):
+    """Копии queryset для каждого шарда; с одним шардом - он сам."""
+    if not is_sharded():
+        return [queryset]
+    return [queryset.using(alias) for alias in settings.POST_SHARDS]
+
+
+def get_sharded(queryset, **lookup):
+    """Как get(), но ищет объект на всех шардах по очереди."""
+    for shard_queryset in on_shards(queryset):
+        try:
+            return shard_queryset.get(**lookup)
+        except queryset.model.DoesNotExist:
+            continue
+    raise queryset.model.DoesNotExist(
+        f'{queryset.model._meta.object_name} не найден ни на одном шарде'
+    )
+
+
+def get_sharded_or_404(queryset, **lookup):
+    try:
+        return get_sharded(queryset, **lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404
+
+
+class ScatterGather:
+    """Посты со всех шардов, слитые по (pub_date, id).
+
+    Срез берётся с начала каждого шарда и сливается кучей, поэтому
+    дальние страницы дороже первых. С одним шардом запросы те же,
+    что и у исходного queryset.
+    """
+
+    ordered = True
+
+    def __init__(self, queryset, descending=True):
+        self.descending = descending
+        self.querysets = on_shards(queryset)
+        if len(self.querysets) > 1:
+            order = ('-pub_date', '-id') if descending else ('pub_date', 'id')
+            self.querysets = [
+                queryset.order_by(*order) for queryset in self.querysets
+            ]
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = sum(
+                queryset.count() for queryset in self.querysets
+            )
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if len(self.querysets) == 1:
+            return list(self.querysets[0][start:stop])
+        merged = heapq.merge(
+            *(queryset[:stop] for queryset in self.querysets),
+            key=lambda post: (post.pub_date, post.id),
+            reverse=self.descending,
+        )
+        return list(islice(merged, start, stop))
+
+
+class ShardRouter:
+    """Отправляет посты и всё, что к ним привязано, на шард автора.
+
+    Комментарии и реакции живут рядом с постом, пользователи, группы
+    и остальные таблицы - в default, откуда пользователи и группы
+    копируются на шарды, чтобы работали JOIN. Запрос без объекта в
+    подсказке идёт в default: читать все шарды нужно явно через
+    on_shards или ScatterGather.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is None or model not in SHARDED_MODELS:
+            return None
+        if isinstance(instance, User):
+            return shard_for(instance.pk) if model in AUTHOR_MODELS else None
+        if not isinstance(instance, SHARDED_MODELS):
+            return None
+        if not instance._state.adding:
+            return instance._state.db
+        if isinstance(instance, AUTHOR_MODELS):
+            return instance.author_id and shard_for(instance.author_id)
+        post_field = type(instance).post
+        if post_field.is_cached(instance):
+            return self.db_for_read(
+                type(instance.post), instance=instance.post
+            )
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Связи с пользователями и группами разрешены на любом шарде."""
+        sharded = [
+            obj for obj in (obj1, obj2) if isinstance(obj, SHARDED_MODELS)
+        ]
+        if len(sharded) < 2:
+            return True
+        if obj1._state.db == obj2._state.db:
+            return True
+        return any(obj._state.adding for obj in sharded) or None
+
+
+def allocate_id():
+    """Следующий id поста или комментария, уникальный на всех шардах.
+
+    При первом обращении последовательность начинается после самого
+    большого id, уже выданного шардами. В таблице остаётся одна
+    строка: AUTOINCREMENT не выдаёт id повторно и после удаления.
+    """
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not ShardedId.objects.exists():
+            start = max(
+                (
+                    model.objects.using(alias).aggregate(
+                        last=Max('id')
+                    )['last'] or 0
+                    for alias in settings.POST_SHARDS
+                    for model in (Post, Comment, ArchivedPost,
+                                  ArchivedComment)
+                ),
+                default=0,
+            )
+            if start:
+                ShardedId.objects.create(pk=start)
+        allocated = ShardedId.objects.create().pk
+        ShardedId.objects.filter(pk__lt=allocated).delete()
+    return allocated
+
+
+def replicate(model, objects, aliases=None):
+    """Копирует строки модели из default на шарды без сигналов."""
+    aliases = replica_aliases() if aliases is None else aliases
+    if not aliases:
+        return
+    values = [
+        {field.attname: getattr(obj, field.attname)
+         for field in model._meta.concrete_fields}
+        for obj in objects
+    ]
+    for alias in aliases:
+        replicas = model._base_manager.using(alias)
+        missing = [
+            row for row in values
+            if not replicas.filter(pk=row['id']).update(**row)
+        ]
+        replicas.bulk_create([model(**row) for row in missing])
+
+
+def _author_rows(alias, author_id):
+    """Строки автора на шарде в порядке, в котором их можно вставлять."""
+    return [
+        Post.objects.using(alias).filter(author_id=author_id),
+        Comment.objects.using(alias).filter(post__author_id=author_id),
+        ArchivedPost.objects.using(alias).filter(author_id=author_id),
+        ArchivedComment.objects.using(alias).filter(
+            post__author_id=author_id
+        ),
+    ]
+
+
+def _insert_raw(model, alias, rows, fields):
+    """Вставляет строки как есть, не трогая auto_now_add, как loaddata."""
+    objects = [model(**row) for row in rows]
+    size = connections[alias].ops.bulk_batch_size(fields, objects) or 1
+    for start in range(0, len(objects), size):
+        model._base_manager.using(alias)._insert(
+            objects[start:start + size], fields=fields, using=alias, raw=True
+        )
+
+
+def sync_rows(queryset, target, batch_size, prune=True):
+    """Приводит копию строк queryset на шарде target к исходной.
+
+    Пачки сравниваются по возрастанию id, записывается только
+    разница, поэтому повторный проход после копирования короткий.
+    Возвращает число записанных строк.
+    """
+    model = queryset.model
+    fields = [field.attname for field in model._meta.concrete_fields]
+    source = queryset.order_by('pk').values(*fields)
+    copies = queryset.using(target)
+    rows = model._base_manager.using(target)
+    written = 0
+    last = 0
+    while True:
+        batch = list(source.filter(pk__gt=last)[:batch_size])
+        window = copies.filter(pk__gt=last)
+        if batch:
+            window = window.filter(pk__lte=batch[-1]['id'])
+        current = {row['id']: row for row in window.values(*fields)}
+        if prune:
+            stale = set(current).difference(row['id'] for row in batch)
+            if stale:
+                rows.filter(pk__in=stale)._raw_delete(target)
+                written += len(stale)
+        missing = [row for row in batch if row['id'] not in current]
+        changed = [
+            row for row in batch
+            if row['id'] in current and current[row['id']] != row
+        ]
+        _insert_raw(model, target, missing, model._meta.concrete_fields)
+        for row in changed:
+            rows.filter(pk=row['id']).update(**row)
+        written += len(missing) + len(changed)
+        if not batch:
+            return written
+        last = batch[-1]['id']
+
+
+def sync_reactions(queryset, target, prune=True):
+    """Как sync_rows, но по ключу (пользователь, пост, реакция).
+
+    id реакций на шардах свои, на них никто не ссылается.
+    """
+    key = ('user_id', 'post_id', 'kind')
+    source = {
+        tuple(row[field] for field in key): row
+        for row in queryset.values(*key, 'created')
+    }
+    current = set(queryset.using(target).values_list(*key))
+    _insert_raw(
+        Reaction,
+        target,
+        [row for reaction, row in source.items() if reaction not in current],
+        [field for field in Reaction._meta.concrete_fields
+         if not field.primary_key],
+    )
+    written = len(source.keys() - current)
+    if prune:
+        for user_id, post_id, kind in current - source.keys():
+            Reaction.objects.using(target).filter(
+                user_id=user_id, post_id=post_id, kind=kind
+            )._raw_delete(target)
+            written += 1
+    return written
+
+
+def _sync_author(source, target, author_id, batch_size, prune=True):
+    written = sum(
+        sync_rows(queryset, target, batch_size, prune)
+        for queryset in _author_rows(source, author_id)
+    )
+    return written + sync_reactions(
+        Reaction.objects.using(source).filter(post__author_id=author_id),
+        target,
+        prune,
+    )
+
+
+def _delete_author(alias, author_id):
+    """Удаляет строки автора без сигналов: это перенос, а не удаление."""
+    Reaction.objects.using(alias).filter(
+        post__author_id=author_id
+    )._raw_delete(alias)
+    for queryset in reversed(_author_rows(alias, author_id)):
+        queryset._raw_delete(alias)
+
+
+def move_author(author_id, target, batch_size=None):
+    """Переносит посты автора со всем, что к ним привязано, на target.
+
+    Пока идёт основное копирование, автор читается и пишется на
+    старом шарде. Затем старый шард блокируется на запись, дописывается
+    набежавшая разница, переключается карта шардов и строки удаляются
+    со старого шарда. Другие процессы видят старую карту ещё до
+    SHARD_MAP_TTL секунд, поэтому последний проход ждёт столько же и
+    переносит записи, ушедшие за это время на старый шард. Возвращает
+    число записанных строк.
+    """
+    batch_size = batch_size or settings.SHARD_MOVE_BATCH_SIZE
+    source = shard_for(author_id)
+    if source == target:
+        return 0
+    written = _sync_author(source, target, author_id, batch_size)
+    with transaction.atomic(using=source), transaction.atomic(using=target):
+        Post.objects.using(source).filter(author_id=author_id).update(
+            views=F('views')
+        )
+        written += _sync_author(source, target, author_id, batch_size)
+        AuthorShard.objects.update_or_create(
+            author_id=author_id, defaults={'shard': target},
+        )
+        _delete_author(source, author_id)
+    forget_shard_map()
+    time.sleep(settings.SHARD_MAP_TTL)
+    written += _sync_author(
+        source, target, author_id, batch_size, prune=False
+    )
+    _delete_author(source, author_id)
+    return written
@@ -0,0 +1,202 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .feeds import bump_feed_version
+from .models import (ArchivedComment, ArchivedPost, AuthorShard, Comment,
+                     Group, Post, Reaction, User, image_storage)
+from .months import count_author_posts, count_post
+from .object_cache import OBJECT_CACHES
+from .pubsub import broker, post_channels
+from .reactions import reaction_counter
+from .shards import (allocate_id, forget_shard_map, is_sharded, on_shards,
+                     replica_aliases, replicate)
+from .sitemaps import touch_chunk
+from .utils import encode_cursor
+
+RENAMED_FIELDS = {Group: 'slug', User: 'username'}
+
+SITEMAP_SECTIONS = {Group: 'groups', User: 'profiles'}
+
+
+def image_in_use(name):
+    """Ссылается ли на файл пост или архивный пост на любом шарде."""
+    return any(
+        queryset.exists()
+        for model in (Post, ArchivedPost)
+        for queryset in on_shards(model.objects.filter(image=name))
+    )
+
+
+def release_image(name):
+    """Удаляет файл и его миниатюры, если на него не ссылается ни один пост.
+
+    Имена файлов определяются содержимым, поэтому один файл может
+    принадлежать нескольким постам: число ссылок считается по индексу
+    на поле image. Недавно загруженный файл не удаляется: пост с ним
+    может быть ещё не сохранён. Такие файлы позже убирает dedupe_media.
+    Возвращает True, если файл удалён.
+    """
+    if not name or image_storage.saved_within(
+        name, settings.IMAGE_RELEASE_GRACE
+    ):
+        return False
+    if image_in_use(name):
+        return False
+    from sorl.thumbnail import delete as delete_thumbnails
+    from sorl.thumbnail.images import ImageFile
+    delete_thumbnails(ImageFile(name, image_storage), delete_file=False)
+    image_storage.delete(name)
+    return True
+
+
+@receiver(pre_save, sender=Post)
+def compare_with_saved(sender, instance, using, **kwargs):
+    """Освобождает заменённую картинку и переносит пост между группами."""
+    if instance.pk is None:
+        return
+    saved = Post.objects.using(using).filter(
+        pk=instance.pk,
+    ).values_list('image', 'group_id').first()
+    if saved is None:
+        return
+    old_name, old_group_id = saved
+    if old_name and old_name != instance.image.name:
+        transaction.on_commit(lambda: release_image(old_name), using)
+    if old_group_id != instance.group_id:
+        count_post(instance, -1, old_group_id or 0)
+        count_post(instance, 1, instance.group_id or 0)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        count_post(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def count_deleted_post(sender, instance, **kwargs):
+    count_post(instance, -1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def release_deleted_image(sender, instance, using, **kwargs):
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: release_image(name), using)
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ArchivedComment)
+def decrement_reply_counts(sender, instance, using, **kwargs):
+    ancestors = instance.path.split('/')[:-1]
+    if ancestors:
+        sender.objects.using(using).filter(
+            pk__in=ancestors, reply_count__gt=0,
+        ).update(
+            reply_count=F('reply_count') - 1
+        )
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def allocate_sharded_id(sender, instance, raw, **kwargs):
+    if instance.pk is None and not raw and is_sharded():
+        instance.pk = allocate_id()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+def replicate_to_shards(sender, instance, using, raw, **kwargs):
+    if using == DEFAULT_DB_ALIAS and not raw:
+        replicate(sender, [instance])
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Group)
+def delete_from_shards(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    for alias in replica_aliases():
+        sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=AuthorShard)
+@receiver(post_delete, sender=AuthorShard)
+def reload_shard_map(sender, **kwargs):
+    forget_shard_map()
+
+
+@receiver(post_save, sender=Reaction)
+def count_reaction(sender, instance, created, **kwargs):
+    if created:
+        reaction_counter.add((instance.post_id, instance.kind))
+
+
+@receiver(post_delete, sender=Reaction)
+def uncount_reaction(sender, instance, **kwargs):
+    reaction_counter.add((instance.post_id, instance.kind), -1)
+
+
+@receiver(post_save, sender=Post)
+def publish_new_post(sender, instance, created, using, **kwargs):
+    if not created:
+        return
+    message = {'id': instance.id, 'cursor': encode_cursor(instance)}
+    channels = post_channels(instance)
+    transaction.on_commit(lambda: broker.publish(channels, message), using)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+def invalidate_feeds(sender, using, **kwargs):
+    transaction.on_commit(bump_feed_version, using)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def handle_rename(sender, instance, using, update_fields, raw, **kwargs):
+    """Сбрасывает кеш по прежнему slug или имени и обновляет карту сайта."""
+    field = RENAMED_FIELDS[sender]
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and field not in update_fields:
+        return
+    old = sender._base_manager.using(using).filter(
+        pk=instance.pk,
+    ).values_list(field, flat=True).first()
+    if old is not None and old != getattr(instance, field):
+        OBJECT_CACHES[sender].forget(field, [old], using)
+        touch_chunk(SITEMAP_SECTIONS[sender], instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def count_author_activation(sender, instance, using, update_fields, raw,
+                            **kwargs):
+    """Отключённый автор уходит из помесячных счётчиков, включённый - нет."""
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    was_active = User._base_manager.using(using).filter(
+        pk=instance.pk,
+    ).values_list('is_active', flat=True).first()
+    if was_active is not None and was_active != instance.is_active:
+        count_author_posts(instance.pk, 1 if instance.is_active else -1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=ArchivedPost)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def forget_cached_object(sender, instance, using, **kwargs):
+    OBJECT_CACHES[sender].forget_object(instance, using)
@@ -0,0 +1,175 @@
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, Exists, F, Max, OuterRef
+from django.urls import reverse
+
+from .models import Group, Post, SitemapVersion, User
+
+STATE_FILE = 'state.json'
+
+INDEX_FILE = 'sitemap.xml'
+
+
+class Section:
+    """Раздел карты сайта, разбитый на куски по диапазонам id."""
+
+    def __init__(self, name, queryset, location, lastmod=None):
+        self.name = name
+        self.queryset = queryset
+        self.location = location
+        self.lastmod = lastmod
+
+    def fingerprints(self):
+        """Число строк, максимальный id и версия каждого куска.
+
+        Число строк и id замечают добавление и удаление, версия -
+        переименования, после которых меняется только адрес.
+        """
+        size = settings.SITEMAP_CHUNK_SIZE
+        rows = self.queryset().annotate(
+            chunk=(F('id') - 1) / size,
+        ).values('chunk').annotate(
+            rows=Count('id'),
+            last=Max('id'),
+        ).values_list('chunk', 'rows', 'last').order_by()
+        versions = dict(SitemapVersion.objects.filter(
+            section=self.name,
+        ).values_list('chunk', 'version'))
+        return {
+            str(chunk): [rows, last, versions.get(chunk, 0)]
+            for chunk, rows, last in rows
+        }
+
+    def entries(self, chunk):
+        """Строки куска, прочитанные пачками по возрастанию id."""
+        size = settings.SITEMAP_CHUNK_SIZE
+        last_id = chunk * size
+        stop_id = (chunk + 1) * size
+        while True:
+            batch = list(self.queryset().filter(
+                id__gt=last_id,
+                id__lte=stop_id,
+            ).order_by('id')[:settings.SITEMAP_BATCH_SIZE].iterator())
+            if not batch:
+                return
+            yield from batch
+            last_id = batch[-1][0]
+
+    def file_name(self, chunk):
+        return f'sitemap-{self.name}-{chunk}.xml'
+
+
+SECTIONS = (
+    Section(
+        'posts',
+        lambda: Post.objects.visible().values_list('id', 'pub_date'),
+        lambda row: reverse('posts:post_detail', kwargs={'post_id': row[0]}),
+        lambda row: row[1],
+    ),
+    Section(
+        'profiles',
+        lambda: User.objects.filter(is_active=True).annotate(
+            has_posts=Exists(Post.objects.filter(
+                author=OuterRef('pk'), is_deleted=False,
+            )),
+        ).filter(has_posts=True).values_list('id', 'username'),
+        lambda row: reverse('posts:profile', kwargs={'username': row[1]}),
+    ),
+    Section(
+        'groups',
+        lambda: Group.objects.filter(is_deleted=False).values_list(
+            'id', 'slug'
+        ),
+        lambda row: reverse('posts:group_list', kwargs={'slug': row[1]}),
+    ),
+)
+
+
+def touch_chunk(section_name, object_id):
+    """Поднимает версию куска, в котором лежит объект."""
+    chunk = (object_id - 1) // settings.SITEMAP_CHUNK_SIZE
+    versions = SitemapVersion.objects.filter(section=section_name, chunk=chunk)
+    if not versions.update(version=F('version') + 1):
+        SitemapVersion.objects.get_or_create(
+            section=section_name, chunk=chunk, defaults={'version': 1},
+        )
+
+
+def write_atomic(path, lines):
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as sitemap:
+        for line in lines:
+            sitemap.write(line)
+    os.replace(temporary, path)
+
+
+def chunk_lines(section, chunk):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for row in section.entries(chunk):
+        location = escape(settings.SITEMAP_BASE_URL + section.location(row))
+        yield f'<url><loc>{location}</loc>'
+        if section.lastmod is not None:
+            lastmod = section.lastmod(row).date().isoformat()
+            yield f'<lastmod>{lastmod}</lastmod>'
+        yield '</url>\n'
+    yield '</urlset>\n'
+
+
+def index_lines(file_names):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield (
+        '<sitemapindex '
+        'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    )
+    for file_name in file_names:
+        location = escape(settings.SITEMAP_BASE_URL + reverse(
+            'posts:sitemap_chunk', kwargs={'file_name': file_name}
+        ))
+        yield f'<sitemap><loc>{location}</loc></sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def load_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE), encoding='utf-8') as state:
+            return json.load(state)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def build_sitemaps(full=False):
+    """Перестраивает только те куски, которые изменились с прошлого раза.
+
+    Возвращает список перезаписанных файлов.
+    """
+    root = settings.SITEMAP_ROOT
+    os.makedirs(root, exist_ok=True)
+    state = {} if full else load_state(root)
+    new_state = {}
+    written = []
+    file_names = []
+    for section in SECTIONS:
+        old = state.get(section.name, {})
+        current = section.fingerprints()
+        new_state[section.name] = current
+        for chunk in sorted(current, key=int):
+            file_name = section.file_name(chunk)
+            file_names.append(file_name)
+            path = os.path.join(root, file_name)
+            if old.get(chunk) == current[chunk] and os.path.exists(path):
+                continue
+            write_atomic(path, chunk_lines(section, int(chunk)))
+            written.append(file_name)
+        for chunk in set(old) - set(current):
+            path = os.path.join(root, section.file_name(chunk))
+            if os.path.exists(path):
+                os.remove(path)
+    write_atomic(os.path.join(root, INDEX_FILE), index_lines(file_names))
+    write_atomic(
+        os.path.join(root, STATE_FILE), [json.dumps(new_state)]
+    )
+    return written
@@ -0,0 +1,87 @@
+from http import HTTPStatus
+
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.admin import EstimatedCountPaginator
+from posts.models import Comment, Group, Post, User
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = Post.objects.bulk_create([Post(
+            text=f'Post {i}',
+            author=cls.admin,
+        ) for i in range(5)])
+        Comment.objects.create(
+            post=Post.objects.first(),
+            author=cls.admin,
+            text='Тестовый комментарий',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists_available(self):
+        """Списки постов и комментариев открываются в админке."""
+        for url in (
+            reverse('admin:posts_post_changelist'),
+            reverse('admin:posts_comment_changelist'),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=0)
+    def test_paginator_uses_estimate_without_filters(self):
+        """Без фильтров пагинатор берёт число строк из статистики."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.filter(comments__isnull=True).first().delete()
+        paginator = EstimatedCountPaginator(Post.objects.all(), 100)
+        with CaptureQueriesContext(connection) as queries:
+            count = paginator.count
+        self.assertEqual(count, len(self.posts))
+        self.assertFalse(any(
+            'COUNT' in query['sql'] for query in queries.captured_queries
+        ))
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=0)
+    def test_paginator_counts_without_statistics(self):
+        """Без статистики таблицы строки считаются точно, а не по id."""
+        Post.objects.filter(comments__isnull=True).first().delete()
+        with connection.cursor() as cursor:
+            if 'sqlite_stat1' in connection.introspection.table_names(
+                cursor
+            ):
+                cursor.execute('DELETE FROM sqlite_stat1')
+        paginator = EstimatedCountPaginator(Post.objects.all(), 100)
+        self.assertEqual(paginator.count, len(self.posts) - 1)
+
+    def test_move_to_group_action(self):
+        """Массовое действие переносит посты в группу одним запросом."""
+        ids = [post.pk for post in Post.objects.all()]
+        self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'move_to_group',
+            'group': self.group.pk,
+            ACTION_CHECKBOX_NAME: ids,
+        })
+        self.assertEqual(
+            Post.objects.filter(group=self.group).count(),
+            len(ids),
+        )
@@ -0,0 +1,107 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.archive import archive_posts
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Post,
+                          PostReactionCount, Reaction, User)
+from posts.reactions import reaction_counter
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.old_post = Post.objects.create(
+            author=cls.user,
+            text='Старый пост',
+        )
+        Comment.objects.create(
+            post=cls.old_post,
+            author=cls.user,
+            text='Старый комментарий',
+        )
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400),
+        )
+        Post.objects.bulk_create([Post(
+            text=f'Post {i}',
+            author=cls.user,
+        ) for i in range(settings.POST_ON_PAGE)])
+        cls.cutoff = timezone.now() - timedelta(
+            days=settings.POST_ARCHIVE_AFTER_DAYS
+        )
+
+    def test_old_posts_moved_to_archive(self):
+        """Старые посты и комментарии к ним переносятся в архив."""
+        archived = archive_posts(self.cutoff, batch_size=1)
+        self.assertEqual(archived, 1)
+        self.assertFalse(Post.objects.filter(pk=self.old_post.pk).exists())
+        self.assertTrue(
+            ArchivedPost.objects.filter(pk=self.old_post.pk).exists()
+        )
+        self.assertEqual(
+            ArchivedComment.objects.filter(post_id=self.old_post.pk).count(),
+            1,
+        )
+        self.assertFalse(Comment.objects.exists())
+
+    def test_reaction_counts_survive_archiving(self):
+        """Счётчики реакций архивного поста не обнуляются."""
+        reaction_counter.pending.clear()
+        Reaction.objects.create(
+            user=self.user, post=self.old_post, kind=Reaction.LIKE
+        )
+        reaction_counter.flush()
+        archive_posts(self.cutoff)
+        reaction_counter.flush()
+        self.assertFalse(Reaction.objects.exists())
+        self.assertEqual(
+            PostReactionCount.objects.get(post_id=self.old_post.pk).count, 1
+        )
+
+    def test_rebuild_keeps_archived_counts(self):
+        """Пересчёт реакций не стирает счётчики архивных постов."""
+        reaction_counter.pending.clear()
+        Reaction.objects.create(
+            user=self.user, post=self.old_post, kind=Reaction.LIKE
+        )
+        reaction_counter.flush()
+        archive_posts(self.cutoff)
+        hot_post = Post.objects.first()
+        Reaction.objects.create(
+            user=self.user, post=hot_post, kind=Reaction.LIKE
+        )
+        reaction_counter.pending.clear()
+        call_command('rebuild_reaction_counts', stdout=StringIO())
+        self.assertEqual(
+            sorted(PostReactionCount.objects.values_list('post_id', 'count')),
+            sorted([(self.old_post.pk, 1), (hot_post.pk, 1)]),
+        )
+
+    def test_profile_falls_through_to_archive(self):
+        """Последняя страница профиля дочитывает посты из архива."""
+        archive_posts(self.cutoff)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user.username})
+            + '?page=2'
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, settings.POST_ON_PAGE + 1)
+        self.assertEqual(page_obj[0].pk, self.old_post.pk)
+
+    def test_post_detail_falls_through_to_archive(self):
+        """Архивный пост открывается по старому адресу."""
+        archive_posts(self.cutoff)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.old_post.pk})
+        )
+        self.assertIsInstance(response.context['post'], ArchivedPost)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(len(response.context['comments']), 1)
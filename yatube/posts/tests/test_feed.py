@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.pubsub import Broker
+from posts.utils import encode_cursor
+
+
+class PostsSinceTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.url = reverse('posts:posts_since')
+
+    def test_cursor_without_new_posts(self):
+        """Без новых постов курсор не меняется."""
+        cursor = encode_cursor(self.post)
+        response = self.client.get(self.url, {'cursor': cursor}).json()
+        self.assertEqual(response['posts'], [])
+        self.assertEqual(response['cursor'], cursor)
+
+    def test_new_posts_returned(self):
+        """Возвращаются только посты новее курсора."""
+        cursor = self.client.get(self.url).json()['cursor']
+        new_post = Post.objects.create(
+            author=self.user,
+            text='Новый пост',
+            group=self.group,
+        )
+        response = self.client.get(self.url, {
+            'cursor': cursor,
+            'feed': 'group',
+            'slug': self.group.slug,
+            'format': 'html',
+        }).json()
+        self.assertEqual(response['posts'], [new_post.id])
+        self.assertEqual(response['cursor'], encode_cursor(new_post))
+        self.assertIn('Новый пост', response['html'][0])
+
+    @override_settings(POSTS_SINCE_LIMIT=2)
+    def test_more_pages_through_all_new_posts(self):
+        """При more=True повторные вызовы отдают все новые посты."""
+        cursor = self.client.get(self.url).json()['cursor']
+        created = [
+            Post.objects.create(author=self.user, text=f'Новый пост {i}').id
+            for i in range(5)
+        ]
+        received = []
+        for _ in range(3):
+            response = self.client.get(self.url, {'cursor': cursor}).json()
+            received.extend(response['posts'])
+            cursor = response['cursor']
+        self.assertFalse(response['more'])
+        self.assertEqual(sorted(received), created)
+        self.assertEqual(received[:2], [created[1], created[0]])
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок недоступна анониму."""
+        response = self.client.get(self.url, {'feed': 'follow'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class BrokerTests(TestCase):
+    def test_subscription_receives_matching_channels(self):
+        """Подписчик получает только уведомления своих каналов."""
+        broker = Broker()
+        subscription = broker.subscribe(['group:1'], maxlen=2)
+        broker.publish(['index', 'group:1'], {'id': 1})
+        broker.publish(['index'], {'id': 2})
+        self.assertEqual(subscription.get(0), ([{'id': 1}], False))
+
+    def test_subscription_memory_is_bounded(self):
+        """Очередь подключения ограничена и сообщает о переполнении."""
+        broker = Broker()
+        subscription = broker.subscribe(['index'], maxlen=2)
+        for post_id in range(5):
+            broker.publish(['index'], {'id': post_id})
+        messages, overflowed = subscription.get(0)
+        self.assertEqual(messages, [{'id': 3}, {'id': 4}])
+        self.assertTrue(overflowed)
+        subscription.close()
+        self.assertFalse(broker.subscriptions)
@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост в ленте',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_contain_posts(self):
+        """Ленты RSS и Atom содержат посты."""
+        for url in (
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile_atom',
+                    kwargs={'username': self.user.username}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn(
+                    'Тестовый пост в ленте', response.content.decode()
+                )
+
+
+class FeedInvalidationTests(TransactionTestCase):
+    """Версия лент меняется в on_commit, поэтому тесты без TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='NoName')
+        Post.objects.create(author=self.user, text='Тестовый пост в ленте')
+
+    def test_feed_not_modified_until_content_changes(self):
+        """Повторный опрос без изменений получает 304, новый пост - 200."""
+        url = reverse('posts:index_rss')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Новый пост', response.content.decode())
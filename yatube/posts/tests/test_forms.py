@@ -1,12 +1,21 @@
+import hashlib
+import os
 import shutil
 import tempfile
+import time
+from io import StringIO
 
 from django.conf import settings
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from posts.models import Comment, Group, Post, User
+from posts.fingerprints import bands, minhash
+from posts.forms import DUPLICATE_ERROR
+from posts.models import Comment, Group, Post, User, image_storage
+from posts.signals import release_image
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -33,6 +42,8 @@ class PostFormTests(TestCase):
             b'\x00\x00\x01\x00\x01\x00\x00\x02'
             b'\x02\x4c\x01\x00\x3b'
         )
+        digest = hashlib.sha256(cls.small_gif).hexdigest()
+        cls.image_name = f'posts/{digest[:2]}/{digest}.gif'
 
     @classmethod
     def tearDownClass(cls):
@@ -70,7 +81,7 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text='Тестовый текст',
                 group=self.group.id,
-                image='posts/small.gif',
+                image=self.image_name,
             ).exists()
         )
 
@@ -111,7 +122,58 @@ class PostFormTests(TestCase):
         first = Post.objects.first()
         self.assertEqual(first.text, form_data['text'])
         self.assertEqual(first.group.id, form_data['group'])
-        self.assertEqual(first.image.name, 'posts/small2.gif')
+        self.assertEqual(first.image.name, self.image_name)
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки разных постов хранятся одним файлом."""
+        names = set()
+        for filename in ('first.gif', 'second.gif'):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={
+                    'text': f'Пост с картинкой {filename}',
+                    'image': SimpleUploadedFile(
+                        name=filename,
+                        content=self.small_gif,
+                        content_type='image/gif',
+                    ),
+                },
+            )
+            names.add(Post.objects.get(
+                text=f'Пост с картинкой {filename}'
+            ).image.name)
+        self.assertEqual(names, {self.image_name})
+
+    def test_recent_upload_not_released(self):
+        """Файл без ссылок не удаляется, пока его недавно загружали."""
+        name = image_storage.save(
+            'posts/small.gif', ContentFile(self.small_gif)
+        )
+        release_image(name)
+        self.assertTrue(image_storage.exists(name))
+        stale = time.time() - settings.IMAGE_RELEASE_GRACE - 1
+        os.utime(image_storage.path(name), (stale, stale))
+        image_storage.save('posts/again.gif', ContentFile(self.small_gif))
+        release_image(name)
+        self.assertTrue(image_storage.exists(name))
+        os.utime(image_storage.path(name), (stale, stale))
+        release_image(name)
+        self.assertFalse(image_storage.exists(name))
+
+    def test_dedupe_media_sweeps_unused_images(self):
+        """Файл, не удалённый в окне загрузки, убирает dedupe_media."""
+        name = image_storage.save(
+            'posts/small.gif', ContentFile(self.small_gif)
+        )
+        release_image(name)
+        call_command('dedupe_media', stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+        stale = time.time() - settings.IMAGE_RELEASE_GRACE - 1
+        os.utime(image_storage.path(name), (stale, stale))
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertFalse(image_storage.exists(name))
+        self.assertIn('неиспользуемых: 1', out.getvalue())
 
     def test_create_comment(self):
         """Валидная форма создает комментарий, если пользователь
@@ -156,3 +218,72 @@ class PostFormTests(TestCase):
                 post=self.post,
             ).exists()
         )
+
+    def test_near_duplicate_post_rejected(self):
+        """Почти такой же недавний пост не проходит проверку."""
+        text = 'Купите лучшие часы со скидкой прямо сейчас на нашем сайте'
+        Post.objects.create(author=self.user, text=text)
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': text.replace('прямо', 'только')},
+            follow=True,
+        )
+        self.assertFormError(
+            response, 'form', 'text', DUPLICATE_ERROR
+        )
+        other = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Сегодня гулял в парке и кормил уток хлебом'},
+        )
+        self.assertRedirects(
+            other,
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+        )
+
+    def test_duplicates_clustered(self):
+        """Команда собирает почти одинаковые посты в одну группу."""
+        text = 'Купите лучшие часы со скидкой прямо сейчас на нашем сайте'
+        spam = [
+            Post.objects.create(author=self.user, text=text),
+            Post.objects.create(
+                author=self.user, text=text.replace('прямо', 'только')
+            ),
+        ]
+        out = StringIO()
+        call_command('cluster_duplicates', stdout=out)
+        self.assertIn(
+            'Post: групп дубликатов 1\n'
+            f'{spam[0].pk} {spam[1].pk}\n',
+            out.getvalue(),
+        )
+
+    def test_similar_texts_share_band(self):
+        """Тексты со сходством на пороге почти всегда делят корзину."""
+        found = 0
+        for trial in range(200):
+            common = [f'w{trial}x{i}' for i in range(28)]
+            first = ' '.join(common + [f'a{trial}x{i}' for i in range(6)])
+            second = ' '.join(common + [f'b{trial}x{i}' for i in range(6)])
+            found += any(
+                a == b for a, b in zip(
+                    bands(minhash(first)), bands(minhash(second))
+                )
+            )
+        self.assertGreaterEqual(found / 200, 0.95)
+
+    def test_reply_to_comment(self):
+        """Ответ на комментарий попадает в его ветку."""
+        parent = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Ответ', 'parent': parent.id},
+        )
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.parent, parent)
+        response = self.client.get(reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': self.post.id, 'comment_id': parent.id},
+        ))
+        self.assertEqual(list(response.context['comments']), [parent, reply])
@@ -1,7 +1,7 @@
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-from posts.models import Group, Post, User
+from posts.models import Comment, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -28,3 +28,48 @@ class PostModelTest(TestCase):
         for field, expected_value in str_tests.items():
             with self.subTest(field=field):
                 self.assertEqual(field, expected_value)
+
+    def test_text_html_rendered_on_save(self):
+        """При сохранении поста текст превращается в безопасный HTML."""
+        post = Post.objects.create(
+            author=self.user,
+            text='<b>Первая</b>\nвторая',
+        )
+        self.assertEqual(
+            post.text_html,
+            '&lt;b&gt;Первая&lt;/b&gt;<br>вторая',
+        )
+
+    @override_settings(COMMENT_MAX_DEPTH=2)
+    def test_comment_thread_order_and_counts(self):
+        """Ответы идут в порядке дерева, глубина ограничена, счётчики верны."""
+        root = Comment.objects.create(
+            post=self.post, author=self.user, text='Корень'
+        )
+        other = Comment.objects.create(
+            post=self.post, author=self.user, text='Другой'
+        )
+        reply = Comment.objects.create(
+            post=self.post, author=self.user, text='Ответ', parent=root
+        )
+        deep = Comment.objects.create(
+            post=self.post, author=self.user, text='Глубже', parent=reply
+        )
+        too_deep = Comment.objects.create(
+            post=self.post, author=self.user, text='Ещё глубже', parent=deep
+        )
+        self.assertEqual((too_deep.depth, too_deep.parent_id), (2, reply.pk))
+        with self.assertNumQueries(1):
+            ordered = list(
+                self.post.comments.order_by('path').values_list(
+                    'pk', flat=True
+                )
+            )
+        self.assertEqual(
+            ordered, [root.pk, reply.pk, deep.pk, too_deep.pk, other.pk]
+        )
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 3)
+        deep.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 2)
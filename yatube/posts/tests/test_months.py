@@ -0,0 +1,134 @@
+from datetime import datetime
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.archive import archive_posts
+from posts.purge import run_purge, schedule_purge
+from posts.models import Group, MonthlyPostCount, Post, User
+from posts.months import month_counter, month_counts
+
+
+class MonthArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        month_counter.pending.clear()
+        self.posts = [
+            self.create_post(datetime(2021, month, day))
+            for month, day in ((1, 5), (1, 20), (3, 1))
+        ]
+        month_counter.pending.clear()
+        call_command('rebuild_month_counts', stdout=StringIO())
+
+    def create_post(self, date, group=None):
+        post = Post.objects.create(
+            author=self.user, text=f'Пост {date}', group=group or self.group,
+        )
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.make_aware(date)
+        )
+        post.refresh_from_db()
+        return post
+
+    def test_counts_follow_delete_but_not_archive(self):
+        """Удаление вычитает пост из счётчиков, перенос в архив - нет."""
+        self.assertEqual(
+            month_counts(MonthlyPostCount.ALL),
+            [(2021, 3, 1), (2021, 1, 2)],
+        )
+        self.posts[0].delete()
+        archive_posts(timezone.make_aware(datetime(2021, 2, 1)))
+        month_counter.flush()
+        self.assertEqual(
+            month_counts(MonthlyPostCount.GROUP, self.group.id, 2021),
+            [(2021, 3, 1), (2021, 1, 1)],
+        )
+
+    def test_purge_flushes_counts_before_exit(self):
+        """Фоновое удаление записывает счётчики, не дожидаясь запроса."""
+        run_purge(schedule_purge(self.posts[2]), pause=0)
+        self.assertFalse(month_counter.pending_items())
+        self.assertEqual(
+            MonthlyPostCount.objects.filter(
+                scope=MonthlyPostCount.ALL, year=2021, month=3
+            ).values_list('count', flat=True).get(),
+            0,
+        )
+
+    def test_hidden_posts_leave_counts_at_once(self):
+        """Скрытый пост вычитается сразу и не вычитается второй раз."""
+        task = schedule_purge(self.posts[0])
+        self.assertEqual(
+            month_counts(MonthlyPostCount.ALL),
+            [(2021, 3, 1), (2021, 1, 1)],
+        )
+        schedule_purge(self.posts[0])
+        run_purge(task, pause=0)
+        self.assertEqual(
+            month_counts(MonthlyPostCount.ALL),
+            [(2021, 3, 1), (2021, 1, 1)],
+        )
+
+    def test_deactivated_author_posts_not_counted(self):
+        """Посты отключённого автора не учитываются, пока он отключён."""
+        archive_posts(timezone.make_aware(datetime(2021, 2, 1)))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(month_counts(MonthlyPostCount.ALL), [])
+        call_command('rebuild_month_counts', stdout=StringIO())
+        self.assertEqual(month_counts(MonthlyPostCount.ALL), [])
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(
+            month_counts(MonthlyPostCount.ALL),
+            [(2021, 3, 1), (2021, 1, 2)],
+        )
+
+    def test_month_page_pages_hot_and_archived_posts(self):
+        """Страница месяца листает посты горячей таблицы и архива."""
+        archive_posts(timezone.make_aware(datetime(2021, 1, 10)))
+        url = reverse('posts:profile_calendar_month',
+                      args=[self.user.username, 2021, 1])
+        with self.settings(POST_ON_PAGE=1):
+            first = self.client.get(url)
+            second = self.client.get(
+                url, {'cursor': first.context['next_cursor']}
+            )
+        self.assertEqual(first.context['count'], 2)
+        self.assertEqual(
+            [post.id for post in first.context['page_obj']
+             + second.context['page_obj']],
+            [self.posts[1].id, self.posts[0].id],
+        )
+        self.assertIsNone(second.context['next_cursor'])
+
+    def test_calendar_index_lists_months(self):
+        """Оглавление по месяцам строится по счётчикам без GROUP BY."""
+        response = self.client.get(
+            reverse('posts:group_calendar', args=[self.group.slug])
+        )
+        self.assertEqual(
+            [(month['date'].month, month['count'])
+             for month in response.context['months']],
+            [(3, 1), (1, 2)],
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:calendar_month', args=[2021, 13])
+            ).status_code,
+            404,
+        )
@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.cache import object_caches
+from posts.models import Group, Post, User
+from posts.object_cache import get_post_or_404, groups, posts, users
+from posts.purge import schedule_purge
+from posts.view_counts import view_counter
+
+TEMP_CACHE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_ROOT,
+    }
+}
+
+
+class ObjectCacheTests(TransactionTestCase):
+    """Кеш не работает в транзакции, поэтому тесты без TestCase."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        for object_cache in object_caches:
+            object_cache.clear()
+            object_cache.hits.clear()
+        view_counter.pending.clear()
+        self.user = User.objects.create_user(username='NoName')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Пост'
+        )
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_lookup_from_local_then_shared_cache(self):
+        """Повторный поиск берёт объект из памяти, затем из общего кеша."""
+        self.assertEqual(groups.get('slug', 'group'), self.group)
+        with self.assertNumQueries(0):
+            first = groups.get('slug', 'group')
+            second = groups.get('slug', 'group')
+        self.assertIsNot(first, second)
+        groups.clear()
+        with self.assertNumQueries(0):
+            groups.get('slug', 'group')
+        self.assertEqual(groups.stats()['local_hits'], 2)
+        self.assertEqual(groups.stats()['shared_hits'], 1)
+        self.assertEqual(groups.stats()['misses'], 1)
+
+    def test_process_local_cache_not_shared(self):
+        """С locmem объект не кладётся в кеш, который чистят другие."""
+        groups.get('slug', 'group')
+        self.assertIsNone(cache.get(groups.key('slug', 'group')))
+        groups.clear()
+        with self.assertNumQueries(1):
+            groups.get('slug', 'group')
+        self.assertEqual(groups.stats()['shared_hits'], 0)
+
+    def test_transaction_bypasses_cache(self):
+        """В транзакции объект всегда читается из базы."""
+        users.get('username', 'NoName')
+        with transaction.atomic():
+            with self.assertNumQueries(1):
+                users.get('username', 'NoName')
+        self.assertEqual(users.stats()['bypassed'], 1)
+
+    def test_save_and_rename_invalidate(self):
+        """Сохранение и переименование сбрасывают старые записи."""
+        users.get('username', 'NoName')
+        self.user.username = 'Renamed'
+        self.user.save()
+        self.assertIsNone(users.get('username', 'NoName'))
+        self.assertEqual(users.get('pk', self.user.pk).username, 'Renamed')
+        get_post_or_404(self.post.pk)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(get_post_or_404(self.post.pk).text, 'Новый текст')
+
+    def test_views_read_past_cache(self):
+        """Просмотры не кешируются и не сбрасывают кеш поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        view_counter.flush()
+        self.assertNotIn('views', posts.get('pk', self.post.pk).__dict__)
+        response = self.client.get(url)
+        self.assertEqual(response.context['post'].views, 1)
+        self.assertEqual(posts.stats()['misses'], 1)
+
+    def test_bulk_updates_invalidate(self):
+        """Скрытие поста тоже сбрасывает кеш."""
+        get_post_or_404(self.post.pk)
+        schedule_purge(self.post)
+        with self.assertRaises(Http404):
+            get_post_or_404(self.post.pk)
+
+    def test_edit_reads_fresh_post(self):
+        """Редактирование берёт пост из базы, а не из кеша."""
+        get_post_or_404(self.post.pk)
+        Post.objects.filter(pk=self.post.pk).update(text='Из базы')
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.context['form'].instance.text, 'Из базы')
+
+    def test_stats_exposed_to_staff(self):
+        """Сотрудник видит долю попаданий по каждому кешу."""
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('posts:group_list', args=['group']))
+        self.client.get(reverse('posts:group_list', args=['group']))
+        response = self.client.get(reverse('core:object_cache_stats'))
+        self.assertEqual(response.json()['group']['hit_rate'], 0.5)
@@ -0,0 +1,110 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import (Comment, Follow, FollowSuggestion, Group,
+                          GroupFollow, Post, PurgeTask, Reaction, User)
+from posts.purge import run_purge, schedule_purge
+
+
+class PurgeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        Post.objects.bulk_create([Post(
+            text=f'Post {i}',
+            author=cls.user,
+        ) for i in range(5)])
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.reader,
+            text='Тестовый комментарий',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_scheduled_post_hidden_immediately(self):
+        """Пост скрывается сразу, а удаляется фоновой задачей."""
+        task = schedule_purge(self.post)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+        run_purge(task, pause=0)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_user_purged_in_batches(self):
+        """Пользователь и его записи удаляются пачками с учётом прогресса."""
+        Reaction.objects.create(
+            user=self.reader, post=self.post, kind=Reaction.LIKE
+        )
+        GroupFollow.objects.create(user=self.user, group=self.group)
+        FollowSuggestion.objects.create(
+            user=self.reader, author=self.user, score=1
+        )
+        task = schedule_purge(self.user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        run_purge(task, batch_size=2, pause=0)
+        task.refresh_from_db()
+        self.assertEqual(task.status, PurgeTask.DONE)
+        self.assertEqual(task.removed, 12)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        for model in (Follow, Reaction, GroupFollow, FollowSuggestion):
+            self.assertFalse(model.objects.exists())
+
+    def test_group_purge_keeps_posts(self):
+        """При удалении группы посты остаются без группы."""
+        run_purge(schedule_purge(self.group), pause=0)
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+        self.post.refresh_from_db()
+        self.assertIsNone(self.post.group)
+
+    def test_deleted_group_not_linked(self):
+        """У постов удалённой группы ссылки на неё не выводятся."""
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        post_url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertContains(self.client.get(post_url), group_url)
+        schedule_purge(self.group)
+        self.assertNotContains(self.client.get(post_url), group_url)
+        profile_url = reverse('posts:profile', args=[self.user.username])
+        self.assertNotContains(self.client.get(profile_url), group_url)
+
+    def test_comment_deleted_in_background(self):
+        """Комментарий из админки скрывается и удаляется задачей."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        self.client.force_login(admin)
+        comment = Comment.objects.get()
+        self.client.post(
+            reverse('admin:posts_comment_delete', args=[comment.pk]),
+            {'post': 'yes'},
+        )
+        comment.refresh_from_db()
+        self.assertTrue(comment.is_deleted)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertNotContains(response, comment.text)
+        task = PurgeTask.objects.get(kind=PurgeTask.COMMENT)
+        run_purge(task, pause=0)
+        self.assertFalse(Comment.objects.exists())
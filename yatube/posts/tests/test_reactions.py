@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, PostReactionCount, Reaction, User
+from posts.reactions import attach_reactions, reaction_counter
+
+
+class ReactionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        reaction_counter.pending.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def react(self, post, kind=Reaction.LIKE):
+        self.client.get(reverse(
+            'posts:react', kwargs={'post_id': post.id, 'kind': kind}
+        ))
+
+    def test_reaction_toggled_and_counted_from_buffer(self):
+        """Повторное нажатие снимает реакцию, счётчик виден до сброса."""
+        post = self.posts[0]
+        self.react(post)
+        self.react(post, Reaction.LOVE)
+        self.react(post, Reaction.LOVE)
+        self.assertTrue(Reaction.objects.filter(
+            user=self.user, post=post, kind=Reaction.LIKE
+        ).exists())
+        self.assertFalse(PostReactionCount.objects.exists())
+        attach_reactions([post], self.user)
+        like = post.reaction_counts[0]
+        self.assertEqual((like['count'], like['mine']), (1, True))
+        self.assertEqual(post.reaction_counts[1]['count'], 0)
+
+    def test_flush_writes_one_row_per_key(self):
+        """Сброс буфера пишет в базу одну строку на пост и реакцию."""
+        writes = reaction_counter.writes
+        for _ in range(3):
+            self.react(self.posts[1])
+            self.react(self.posts[1])
+        self.react(self.posts[1])
+        reaction_counter.flush()
+        self.assertEqual(reaction_counter.writes - writes, 1)
+        self.assertEqual(
+            PostReactionCount.objects.get(post_id=self.posts[1].id).count, 1
+        )
+
+    def test_feed_page_reactions_fetched_in_batch(self):
+        """Реакции всех постов страницы загружаются двумя запросами."""
+        self.react(self.posts[2])
+        reaction_counter.flush()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(2):
+            attach_reactions(posts, self.user)
+        self.assertEqual(
+            [post.reaction_counts[0]['count'] for post in posts], [1, 0, 0]
+        )
+
+    def test_cached_index_buttons_follow_login(self):
+        """Кеш главной не отдаёт гостю кнопки, а вошедшему - без кнопок."""
+        react_url = reverse(
+            'posts:react',
+            kwargs={'post_id': self.posts[0].id, 'kind': Reaction.LIKE},
+        )
+        self.assertNotContains(Client().get(reverse('posts:index')), react_url)
+        self.assertContains(self.client.get(reverse('posts:index')), react_url)
+        self.assertNotContains(Client().get(reverse('posts:index')), react_url)
@@ -0,0 +1,136 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts.models import AuthorShard, Comment, Post, Reaction, User
+from posts.shards import (ScatterGather, ShardRouter, allocate_id,
+                          assigned_shards, forget_shard_map, move_author,
+                          shard_for)
+
+SHARDS = ['default', 'other']
+
+
+class ShardTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(3)
+        ]
+
+    @override_settings(POST_SHARDS=SHARDS)
+    def test_author_shard_from_map_or_id(self):
+        """Шард автора берётся из карты, а без записи - по остатку id."""
+        self.assertEqual(shard_for(4), 'default')
+        self.assertEqual(shard_for(5), 'other')
+        AuthorShard.objects.create(author=self.user, shard='other')
+        self.assertEqual(shard_for(self.user.pk), 'other')
+
+    @override_settings(POST_SHARDS=SHARDS)
+    def test_router_follows_author_and_post(self):
+        """Новый пост идёт на шард автора, комментарий - к посту."""
+        AuthorShard.objects.create(author=self.user, shard='other')
+        router = ShardRouter()
+        post = Post(author=self.user, text='Новый пост')
+        self.assertEqual(router.db_for_write(Post, instance=post), 'other')
+        comment = Comment(post=self.posts[0], author=self.user, text='Да')
+        self.assertEqual(
+            router.db_for_write(Comment, instance=comment), 'default'
+        )
+        self.assertIsNone(router.db_for_read(Comment, instance=self.user))
+
+    def test_single_shard_scatter_gather_is_plain_queryset(self):
+        """С одним шардом слияние не меняет ни порядок, ни число запросов."""
+        posts = Post.objects.order_by('-pub_date', '-id')
+        with self.assertNumQueries(1):
+            page = ScatterGather(posts)[1:3]
+        self.assertEqual(page, list(posts[1:3]))
+
+    def test_allocated_ids_continue_after_existing(self):
+        """Общие id начинаются после уже выданных и не повторяются."""
+        first = allocate_id()
+        self.assertGreater(first, max(post.id for post in self.posts))
+        self.assertEqual(allocate_id(), first + 1)
+
+    def test_reshard_checks_arguments(self):
+        """Перенос на неизвестный шард или на свой шард ничего не делает."""
+        with self.assertRaises(CommandError):
+            call_command('reshard', 'missing', self.user.username)
+        self.assertEqual(move_author(self.user.pk, 'default'), 0)
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 3)
+
+
+@override_settings(POST_SHARDS=SHARDS, SHARD_MAP_TTL=0)
+class TwoShardTests(TestCase):
+    databases = {'default', 'other'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.near = User.objects.create_user(username='near')
+        cls.far = User.objects.create_user(username='far')
+        AuthorShard.objects.create(author=cls.near, shard='default')
+        AuthorShard.objects.create(author=cls.far, shard='other')
+        cls.posts = [
+            Post.objects.create(author=author, text=f'Пост {i}')
+            for i, author in enumerate([cls.near, cls.far] * 3)
+        ]
+        for post in cls.posts[1::2]:
+            post.comments.create(author=cls.near, text='Да')
+            post.reactions.create(user=cls.near, kind=Reaction.LIKE)
+
+    def test_posts_written_to_author_shard(self):
+        """Посты, комментарии и реакции лежат на шарде автора поста."""
+        self.assertEqual(Post.objects.using('default').count(), 3)
+        self.assertEqual(Post.objects.using('other').count(), 3)
+        self.assertEqual(Comment.objects.using('other').count(), 3)
+        self.assertEqual(Reaction.objects.using('other').count(), 3)
+        self.assertFalse(Comment.objects.using('default').exists())
+
+    def test_scatter_gather_merges_shards(self):
+        """Слияние отдаёт посты обоих шардов по дате и считает все."""
+        posts = ScatterGather(Post.objects.all())
+        self.assertEqual(posts.count(), 6)
+        self.assertEqual(
+            [post.pk for post in posts[1:5]],
+            [post.pk for post in reversed(self.posts)][1:5],
+        )
+        oldest = ScatterGather(Post.objects.all(), descending=False)
+        self.assertEqual(oldest[0].pk, self.posts[0].pk)
+
+    def test_reshard_moves_author_rows(self):
+        """Перенос автора переносит его строки и переключает карту."""
+        moved = Post.objects.using('other').get(pk=self.posts[1].pk)
+        call_command('reshard', 'default', 'far', stdout=StringIO())
+        self.assertEqual(shard_for(self.far.pk), 'default')
+        self.assertFalse(Post.objects.using('other').exists())
+        self.assertFalse(Comment.objects.using('other').exists())
+        self.assertFalse(Reaction.objects.using('other').exists())
+        self.assertEqual(Post.objects.using('default').count(), 6)
+        self.assertEqual(Comment.objects.using('default').count(), 3)
+        self.assertEqual(Reaction.objects.using('default').count(), 3)
+        copy = Post.objects.using('default').get(pk=moved.pk)
+        self.assertEqual(copy.pub_date, moved.pub_date)
+        self.assertEqual(copy.text, moved.text)
+
+
+class ShardMapTests(TransactionTestCase):
+    """Вне транзакции карта читается из кеша, поэтому без TestCase."""
+
+    def setUp(self):
+        forget_shard_map()
+        self.user = User.objects.create_user(username='NoName')
+        AuthorShard.objects.create(author=self.user, shard='other')
+
+    @override_settings(SHARD_MAP_TTL=60)
+    def test_shard_map_cached_until_changed(self):
+        """Карта не читается на каждый пост и сбрасывается при записи."""
+        with self.assertNumQueries(1):
+            assigned_shards()
+            self.assertEqual(assigned_shards()[self.user.pk], 'other')
+        AuthorShard.objects.filter(author=self.user).update(shard='default')
+        self.assertEqual(assigned_shards()[self.user.pk], 'other')
+        AuthorShard.objects.get(author=self.user).save()
+        self.assertEqual(assigned_shards()[self.user.pk], 'default')
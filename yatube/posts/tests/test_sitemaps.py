@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.sitemaps import build_sitemaps
+
+TEMP_SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(SITEMAP_ROOT=TEMP_SITEMAP_ROOT, SITEMAP_CHUNK_SIZE=2)
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+
+    def test_sitemap_files_served(self):
+        """Индекс и куски карты сайта доступны по адресам."""
+        build_sitemaps(full=True)
+        index = self.client.get(reverse('posts:sitemap'))
+        content = b''.join(index.streaming_content).decode()
+        self.assertIn('sitemap-posts-0.xml', content)
+        self.assertIn('sitemap-groups-0.xml', content)
+        chunk = self.client.get(reverse(
+            'posts:sitemap_chunk',
+            kwargs={'file_name': 'sitemap-profiles-0.xml'},
+        ))
+        self.assertIn(
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            b''.join(chunk.streaming_content).decode(),
+        )
+
+    def test_only_touched_chunks_rewritten(self):
+        """Повторная сборка перезаписывает только изменившиеся куски."""
+        build_sitemaps(full=True)
+        self.assertEqual(build_sitemaps(), [])
+        Post.objects.create(author=self.user, text='Новый пост')
+        written = build_sitemaps()
+        self.assertIn('sitemap-posts-1.xml', written)
+        self.assertNotIn('sitemap-posts-0.xml', written)
+        self.assertTrue(os.path.exists(
+            os.path.join(TEMP_SITEMAP_ROOT, 'sitemap-posts-1.xml')
+        ))
+
+    def test_rename_rewrites_chunk(self):
+        """Переименование пользователя перестраивает его кусок."""
+        build_sitemaps(full=True)
+        self.user.username = 'Renamed'
+        self.user.save()
+        self.assertEqual(build_sitemaps(), ['sitemap-profiles-0.xml'])
+        with open(os.path.join(
+            TEMP_SITEMAP_ROOT, 'sitemap-profiles-0.xml'
+        ), encoding='utf-8') as sitemap:
+            self.assertIn('/profile/Renamed/', sitemap.read())
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, FollowSuggestion, User
+from posts.suggestions import build_suggestions
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.twin, cls.friend, cls.popular, cls.niche, cls.gone = (
+            User.objects.create_user(username=name)
+            for name in (
+                'reader', 'twin', 'friend', 'popular', 'niche', 'gone'
+            )
+        )
+        for user, author in (
+            (cls.reader, cls.friend),
+            (cls.friend, cls.popular),
+            (cls.friend, cls.niche),
+            (cls.friend, cls.gone),
+            (cls.twin, cls.friend),
+            (cls.twin, cls.popular),
+        ):
+            Follow.objects.create(user=user, author=author)
+        cls.gone.is_active = False
+        cls.gone.save()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_friends_of_friends_suggested(self):
+        """Рекомендуются друзья друзей, выше - с совместными подписками."""
+        build_suggestions()
+        suggested = list(
+            FollowSuggestion.objects.filter(user=self.reader)
+            .values_list('author__username', flat=True)
+        )
+        self.assertEqual(set(suggested), {'popular', 'niche'})
+        self.assertEqual(suggested[0], 'popular')
+
+    def test_suggestions_shown_and_dropped_on_follow(self):
+        """Рекомендации видны в профиле и пропадают после подписки."""
+        build_suggestions()
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'friend'})
+        )
+        self.assertEqual(len(response.context['suggestions']), 2)
+        client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'popular'})
+        )
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [s.author for s in response.context['suggestions']],
+            [self.niche],
+        )
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.view_counts import view_counter
+
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        view_counter.pending.clear()
+
+    def view(self, post, client=None):
+        return (client or self.client).get(reverse(
+            'posts:post_detail', kwargs={'post_id': post.id}
+        ))
+
+    def test_repeat_views_counted_once(self):
+        """Повторные просмотры одного читателя засчитываются один раз."""
+        post = self.posts[0]
+        for _ in range(3):
+            response = self.view(post)
+        other = Client(HTTP_USER_AGENT='other')
+        response = self.view(post, other)
+        self.assertEqual(response.context['post'].views, 2)
+        self.assertEqual(Post.objects.get(pk=post.pk).views, 0)
+
+    def test_flush_writes_buffered_views(self):
+        """Сброс пишет накопленные просмотры всех постов пачкой."""
+        increments = view_counter.increments
+        writes = view_counter.writes
+        for number in range(3):
+            client = Client(HTTP_USER_AGENT=f'reader {number}')
+            for post in self.posts:
+                self.view(post, client)
+        self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(view_counter.increments - increments, 6)
+        self.assertEqual(view_counter.writes - writes, 2)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('views', flat=True)),
+            [3, 3],
+        )
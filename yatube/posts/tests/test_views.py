@@ -9,7 +9,7 @@ from django.urls import reverse
 from django import forms
 
 from posts.forms import PostForm
-from posts.models import Comment, Follow, Group, Post, User
+from posts.models import Comment, Follow, Group, GroupFollow, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -291,6 +291,13 @@ class PostsPagesTests(TestCase):
         response_cache_deleted = self.client.get(address).content
         self.assertNotEqual(response, response_cache_deleted)
 
+    def test_cached_index_skips_page_queries(self):
+        """Из кеша главная отдаётся без подсчёта и выборки постов."""
+        address, _ = self.index
+        self.client.get(address)
+        with self.assertNumQueries(0):
+            self.client.get(address)
+
     def test_add_follow(self):
         """Проверка подписки на автора."""
         self.authorized_client.get(self.profile_follow)
@@ -333,3 +340,44 @@ class PostsPagesTests(TestCase):
             post_by_user_two,
             response.context["page_obj"]
         )
+
+    def test_group_follow_and_unfollow(self):
+        """Подписка на группу и отписка от неё."""
+        address, _ = self.group_list
+        self.authorized_client.get(address + 'follow/')
+        self.assertTrue(
+            GroupFollow.objects.filter(user=self.user, group=self.group)
+            .exists()
+        )
+        self.authorized_client.get(address + 'unfollow/')
+        self.assertFalse(
+            GroupFollow.objects.filter(user=self.user, group=self.group)
+            .exists()
+        )
+
+    def test_follow_feed_merges_authors_and_groups(self):
+        """Лента подписок сливает авторов и группы без повторов."""
+        address, _ = self.follow
+        Follow.objects.create(user=self.user_two, author=self.user)
+        GroupFollow.objects.create(user=self.user_two, group=self.group)
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user if i % 2 else self.user_two,
+                group=self.group,
+                text=f'Пост {i}',
+            )
+            for i in range(settings.POST_ON_PAGE + 2)
+        ]
+        posts.sort(key=lambda post: (post.pub_date, post.id), reverse=True)
+        client = Client()
+        client.force_login(self.user_two)
+        response = client.get(address)
+        first_page = response.context['page_obj']
+        self.assertEqual(first_page, posts[:settings.POST_ON_PAGE])
+        response = client.get(
+            address, {'cursor': response.context['next_cursor']}
+        )
+        self.assertEqual(
+            response.context['page_obj'], posts[settings.POST_ON_PAGE:]
+        )
+        self.assertIsNone(response.context['next_cursor'])
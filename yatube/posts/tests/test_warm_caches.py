@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+TEMP_CACHE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_ROOT,
+    }
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class WarmCachesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=(
+                    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+                    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+                    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+                    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+                    b'\x02\x4c\x01\x00\x3b'
+                ),
+                content_type='image/gif',
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_hot_pages_and_thumbnails_warmed(self):
+        """Команда открывает главную и готовит миниатюры."""
+        out = StringIO()
+        call_command('warm_caches', workers=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn(f'200 {reverse("posts:index")} ', output)
+        self.assertNotIn(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}), output
+        )
+        self.assertNotIn(
+            reverse('posts:profile', kwargs={'username': 'NoName'}), output
+        )
+        self.assertIn('страниц главной 3 из 3', output)
+        self.assertIn('миниатюр 1', output)
+
+    def test_local_cache_warms_only_thumbnails(self):
+        """С кешем в памяти процесса страницы не открываются."""
+        out = StringIO()
+        call_command('warm_caches', workers=1, stdout=out)
+        self.assertIn('страниц главной 0 из 0', out.getvalue())
+        self.assertIn('миниатюр 1', out.getvalue())
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_budget_stops_warming(self):
+        """Исчерпанный бюджет времени останавливает прогрев."""
+        out = StringIO()
+        call_command('warm_caches', workers=1, budget=0, stdout=out)
+        self.assertIn('страниц главной 0', out.getvalue())
@@ -1,6 +1,6 @@
-from django.urls import path
+from django.urls import path, re_path
 
-from . import views
+from . import feeds, views
 
 
 app_name = 'posts'
@@ -9,6 +9,36 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'rss/',
+        feeds.cached_feed(feeds.LatestPostsFeed()),
+        name='index_rss'
+    ),
+    path(
+        'atom/',
+        feeds.cached_feed(feeds.LatestPostsAtomFeed()),
+        name='index_atom'
+    ),
+    path(
+        'group/<slug:slug>/rss/',
+        feeds.cached_feed(feeds.GroupPostsFeed()),
+        name='group_rss'
+    ),
+    path(
+        'group/<slug:slug>/atom/',
+        feeds.cached_feed(feeds.GroupPostsAtomFeed()),
+        name='group_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.cached_feed(feeds.AuthorPostsFeed()),
+        name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.cached_feed(feeds.AuthorPostsAtomFeed()),
+        name='profile_atom'
+    ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/',
@@ -16,8 +46,67 @@ urlpatterns = [
         name='add_comment'
     ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/react/<str:kind>/',
+        views.react,
+        name='react'
+    ),
+    path(
+        'posts/<int:post_id>/comments/<int:comment_id>/',
+        views.comment_thread,
+        name='comment_thread'
+    ),
     path('create/', views.post_create, name='post_create'),
+    path('calendar/', views.calendar, name='calendar'),
+    path(
+        'calendar/<int:year>/',
+        views.calendar,
+        name='calendar_year'
+    ),
+    path(
+        'calendar/<int:year>/<int:month>/',
+        views.calendar_month,
+        name='calendar_month'
+    ),
+    path(
+        'group/<slug:slug>/calendar/',
+        views.calendar,
+        name='group_calendar'
+    ),
+    path(
+        'group/<slug:slug>/calendar/<int:year>/',
+        views.calendar,
+        name='group_calendar_year'
+    ),
+    path(
+        'group/<slug:slug>/calendar/<int:year>/<int:month>/',
+        views.calendar_month,
+        name='group_calendar_month'
+    ),
+    path(
+        'profile/<str:username>/calendar/',
+        views.calendar,
+        name='profile_calendar'
+    ),
+    path(
+        'profile/<str:username>/calendar/<int:year>/',
+        views.calendar,
+        name='profile_calendar_year'
+    ),
+    path(
+        'profile/<str:username>/calendar/<int:year>/<int:month>/',
+        views.calendar_month,
+        name='profile_calendar_month'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('feed/since/', views.posts_since, name='posts_since'),
+    path('feed/stream/', views.feed_stream, name='feed_stream'),
+    path('sitemap.xml', views.sitemap_chunk, name='sitemap'),
+    re_path(
+        r'^(?P<file_name>sitemap-[a-z]+-\d+\.xml)$',
+        views.sitemap_chunk,
+        name='sitemap_chunk'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -28,4 +117,14 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'group/<slug:slug>/follow/',
+        views.group_follow,
+        name='group_follow'
+    ),
+    path(
+        'group/<slug:slug>/unfollow/',
+        views.group_unfollow,
+        name='group_unfollow'
+    ),
 ]
@@ -1,5 +1,10 @@
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
 
 
 def paginator(request, posts):
@@ -7,3 +12,83 @@ def paginator(request, posts):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def page_number(request):
+    """Запрошенный номер страницы для ключа кеша, без запросов к базе.
+
+    Нечисловой номер Paginator.get_page заменяет первой страницей.
+    """
+    number = request.GET.get('page', '')
+    return str(int(number)) if number.isdigit() else '1'
+
+
+def encode_cursor(post):
+    """Курсор (pub_date, id) поста в виде строки для URL."""
+    delta = post.pub_date - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    microseconds = delta // timedelta(microseconds=1)
+    return f'{microseconds}-{post.id}'
+
+
+def decode_cursor(value):
+    try:
+        microseconds, post_id = (int(part) for part in value.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    pub_date = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(
+        microseconds=microseconds
+    )
+    return pub_date, post_id
+
+
+def newer_than(posts, cursor):
+    pub_date, post_id = cursor
+    return posts.filter(
+        Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=post_id)
+    )
+
+
+def older_than(posts, cursor):
+    pub_date, post_id = cursor
+    return posts.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=post_id)
+    )
+
+
+def keyset_stream(posts, batch_size, cursor=None):
+    """Посты по убыванию (pub_date, id), читаемые пачками по курсору."""
+    posts = posts.order_by('-pub_date', '-id')
+    while True:
+        batch = list(
+            (older_than(posts, cursor) if cursor else posts)[:batch_size]
+        )
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        cursor = (batch[-1].pub_date, batch[-1].id)
+
+
+def _skip_repeats(posts):
+    """Повторы в слитом потоке идут подряд: ключ сортировки уникален."""
+    last_id = None
+    for post in posts:
+        if post.id != last_id:
+            yield post
+        last_id = post.id
+
+
+def merged_page(streams, size, cursor=None):
+    """Страница ленты из нескольких потоков постов и курсор следующей.
+
+    Потоки сливаются кучей, из каждого читается не больше size + 1
+    постов за запрос, так что стоимость зависит от размера страницы.
+    Пост, попавший в несколько потоков, показывается один раз.
+    """
+    merged = heapq.merge(
+        *(keyset_stream(posts, size + 1, cursor) for posts in streams),
+        key=lambda post: (post.pub_date, post.id),
+        reverse=True,
+    )
+    page = list(islice(_skip_repeats(merged), size + 1))
+    next_cursor = encode_cursor(page[size - 1]) if len(page) > size else None
+    return page[:size], next_cursor
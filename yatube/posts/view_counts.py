@@ -0,0 +1,66 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .counters import BufferedCounter
+from .models import ArchivedPost, Post
+from .shards import on_shards
+
+WRITE_CHUNK = 500
+
+
+def write_views(deltas):
+    """Прибавляет просмотры одним UPDATE на пачку постов.
+
+    Дельта каждого поста подставляется через CASE, так что сброс
+    сотни просмотренных постов - один запрос на шард, а не сотня.
+    Пост мог за это время уйти в архив с тем же id, поэтому
+    обновляются обе таблицы.
+    """
+    items = sorted(deltas.items())
+    with transaction.atomic():
+        for start in range(0, len(items), WRITE_CHUNK):
+            chunk = dict(items[start:start + WRITE_CHUNK])
+            increment = Case(
+                *(When(pk=pk, then=Value(delta))
+                  for pk, delta in chunk.items()),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            for model in (Post, ArchivedPost):
+                for posts in on_shards(model.objects.filter(pk__in=chunk)):
+                    posts.update(views=F('views') + increment)
+
+
+view_counter = BufferedCounter('views', write_views)
+
+
+def viewer_key(request):
+    """Кто смотрит: сессия, пользователь или адрес с браузером.
+
+    Сессию ради счётчика не создаём, чтобы анонимные просмотры не
+    писали в базу строки сессий.
+    """
+    if request.session.session_key:
+        return request.session.session_key
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    agent = request.META.get('HTTP_USER_AGENT', '')
+    address = request.META.get('REMOTE_ADDR', '')
+    return hashlib.md5(f'{address} {agent}'.encode()).hexdigest()
+
+
+def count_view(request, post):
+    """Засчитывает просмотр поста не чаще раза за POST_VIEW_WINDOW.
+
+    Повтор отсекается атомарным cache.add, сам просмотр копится в
+    буфере процесса. В post.views - сохранённое значение вместе с
+    ещё не записанными просмотрами.
+    """
+    key = f'post_view:{post.pk}:{viewer_key(request)}'
+    if cache.add(key, 1, settings.POST_VIEW_WINDOW):
+        view_counter.add(post.pk)
+    post.views += view_counter.pending_delta(post.pk)
@@ -1,54 +1,142 @@
+import os
+from datetime import date
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import get_object_or_404, redirect, render
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import (FileResponse, Http404, JsonResponse,
+                         StreamingHttpResponse)
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_GET
 
+from .archive import ArchiveChain
 from .forms import CommentForm, PostForm
-from .models import Group, Follow, Post, User
-from .utils import paginator
+from .models import (ArchivedPost, Comment, Follow, FollowSuggestion,
+                     GroupFollow, MonthlyPostCount, Post, Reaction)
+from .months import month_counts, month_range
+from .object_cache import (get_author_or_404, get_group_or_404,
+                           get_post_or_404)
+from .pubsub import event_stream
+from .reactions import attach_reactions, toggle_reaction
+from .shards import ScatterGather, get_sharded_or_404, on_shards, shard_for
+from .sitemaps import INDEX_FILE
+from .suggestions import suggestions_for
+from .utils import (decode_cursor, encode_cursor, merged_page, newer_than,
+                    page_number, paginator)
+from .view_counts import count_view
 
 
 def index(request):
-    posts = Post.objects.all().select_related(
-        'group', 'author')
+    """Главная: страница постов строится, только если её нет в кеше."""
+    def index_page():
+        posts = ArchiveChain(
+            ScatterGather(
+                Post.objects.visible().select_related('group', 'author')
+            ),
+            ScatterGather(ArchivedPost.objects.filter(
+                author__is_active=True,
+            ).select_related('group', 'author')),
+        )
+        page_obj = paginator(request, posts)
+        attach_reactions(page_obj)
+        return page_obj
+
     context = {
-        'page_obj': paginator(request, posts),
+        'page_obj': SimpleLazyObject(index_page),
+        'page_number': page_number(request),
     }
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all().select_related('author')
+    group = get_group_or_404(slug)
+    posts = ArchiveChain(
+        ScatterGather(group.posts.visible().select_related('author')),
+        ScatterGather(group.archived_posts.filter(
+            author__is_active=True,
+        ).select_related('author')),
+    )
+    following = request.user.is_authenticated and group.followers.filter(
+        user=request.user
+    ).exists()
+    page_obj = paginator(request, posts)
+    attach_reactions(page_obj, request.user)
     context = {
         'group': group,
-        'page_obj': paginator(request, posts),
+        'following': following,
+        'page_obj': page_obj,
     }
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_author_or_404(username)
+    posts = ArchiveChain(
+        author.posts.filter(is_deleted=False).select_related('group'),
+        author.archived_posts.all().select_related('group'),
+    )
     following = author.following.exists()
+    page_obj = paginator(request, posts)
+    attach_reactions(page_obj, request.user)
     context = {
         'author': author,
         'following': following,
-        'page_obj': paginator(request, posts),
+        'page_obj': page_obj,
+        'suggestions': suggestions_for(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post_or_404(post_id, archived=True)
+    archived = isinstance(post, ArchivedPost)
+    post.refresh_from_db(fields=['views'])
+    count_view(request, post)
+    attach_reactions([post], request.user)
     form = CommentForm(None)
-    comments = post.comments.all()
+    if archived:
+        comments = post.comments.filter(author__is_active=True)
+    else:
+        comments = post.comments.visible()
+    comments = comments.filter(
+        depth__lte=settings.COMMENT_COLLAPSE_DEPTH,
+    ).select_related('author').order_by('path')
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'archived': archived,
+        'reply_to': request.GET.get('reply_to', ''),
+        'collapse_depth': settings.COMMENT_COLLAPSE_DEPTH,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comment_thread(request, post_id, comment_id):
+    root = get_sharded_or_404(
+        Comment.objects.visible().select_related('post'),
+        pk=comment_id,
+        post_id=post_id,
+        post__is_deleted=False,
+    )
+    comments = root.post.comments.visible().filter(
+        post_id=post_id,
+        path__startswith=root.path,
+    ).select_related('author').order_by('path')
+    context = {
+        'post': root.post,
+        'root': root,
+        'form': CommentForm(None),
+        'comments': comments,
+        'reply_to': request.GET.get('reply_to', ''),
+    }
+    return render(request, 'posts/comment_thread.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -66,7 +154,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     is_edit = True
-    post = get_object_or_404(Post, id=post_id)
+    post = get_sharded_or_404(Post.objects.visible(), pk=post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
@@ -86,35 +174,282 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_sharded_or_404(Post.objects.visible(), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        parent_id = request.POST.get('parent', '')
+        if parent_id.isdigit():
+            comment.parent = post.comments.visible().filter(
+                pk=parent_id,
+            ).first()
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def followed_streams(user):
+    """Отдельный поток постов для каждого автора и группы подписок."""
+    posts = Post.objects.visible().select_related('author', 'group')
+    authors = Follow.objects.filter(
+        user=user, author__is_active=True,
+    ).values_list('author_id', flat=True)
+    groups = GroupFollow.objects.filter(
+        user=user, group__is_deleted=False,
+    ).values_list('group_id', flat=True)
+    return (
+        [
+            posts.filter(author_id=author_id).using(shard_for(author_id))
+            for author_id in authors
+        ]
+        + [
+            queryset for group_id in groups
+            for queryset in on_shards(posts.filter(group_id=group_id))
+        ]
+    )
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    cursor = decode_cursor(request.GET.get('cursor', ''))
+    page, next_cursor = merged_page(
+        followed_streams(request.user), settings.POST_ON_PAGE, cursor
+    )
+    attach_reactions(page, request.user)
     context = {
-        'page_obj': paginator(request, posts),
+        'page_obj': page,
+        'cursor': request.GET.get('cursor', '') if cursor else '',
+        'next_cursor': next_cursor,
+        'suggestions': suggestions_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
+def month_scope(slug=None, username=None):
+    """Счётчики, фильтр постов и контекст страниц «по месяцам»."""
+    if slug is not None:
+        group = get_group_or_404(slug)
+        return (MonthlyPostCount.GROUP, group.id), {'group': group}, {
+            'group': group,
+            'title': f'Записи сообщества {group.title}',
+            'url_prefix': 'posts:group_',
+            'url_args': [slug],
+        }
+    if username is not None:
+        author = get_author_or_404(username)
+        return (MonthlyPostCount.AUTHOR, author.id), {'author': author}, {
+            'author': author,
+            'title': (
+                f'Посты пользователя {author.get_full_name() or author}'
+            ),
+            'url_prefix': 'posts:profile_',
+            'url_args': [username],
+        }
+    return (MonthlyPostCount.ALL, 0), {}, {
+        'title': 'Записи на сайте',
+        'url_prefix': 'posts:',
+        'url_args': [],
+    }
+
+
+def calendar(request, year=None, slug=None, username=None):
+    scope, _, context = month_scope(slug, username)
+    prefix, args = context['url_prefix'], context['url_args']
+    context['year'] = year
+    context['months'] = [
+        {
+            'date': date(month_year, month, 1),
+            'count': count,
+            'url': reverse(f'{prefix}calendar_month',
+                           args=args + [month_year, month]),
+            'year_url': reverse(f'{prefix}calendar_year',
+                                args=args + [month_year]),
+        }
+        for month_year, month, count in month_counts(*scope, year)
+    ]
+    context['calendar_url'] = reverse(f'{prefix}calendar', args=args)
+    return render(request, 'posts/calendar.html', context)
+
+
+def calendar_month(request, year, month, slug=None, username=None):
+    scope, lookup, context = month_scope(slug, username)
+    try:
+        start, end = month_range(year, month)
+    except ValueError:
+        raise Http404
+    lookup.update(pub_date__gte=start, pub_date__lt=end)
+    posts = Post.objects.visible().filter(**lookup)
+    archived = ArchivedPost.objects.filter(author__is_active=True, **lookup)
+    if 'author' in lookup:
+        shard = shard_for(lookup['author'].id)
+        streams = [posts.using(shard), archived.using(shard)]
+    else:
+        streams = on_shards(posts) + on_shards(archived)
+    cursor = decode_cursor(request.GET.get('cursor', ''))
+    page, next_cursor = merged_page(
+        [stream.select_related('author', 'group') for stream in streams],
+        settings.POST_ON_PAGE,
+        cursor,
+    )
+    attach_reactions(page, request.user)
+    prefix, args = context['url_prefix'], context['url_args']
+    context.update({
+        'month': start,
+        'count': next(
+            (
+                count for _, number, count in month_counts(*scope, year)
+                if number == month
+            ),
+            0,
+        ),
+        'page_obj': page,
+        'cursor': request.GET.get('cursor', '') if cursor else '',
+        'next_cursor': next_cursor,
+        'calendar_url': reverse(f'{prefix}calendar', args=args),
+        'year_url': reverse(f'{prefix}calendar_year', args=args + [year]),
+    })
+    return render(request, 'posts/calendar_month.html', context)
+
+
+@login_required
+def react(request, post_id, kind):
+    if kind not in dict(Reaction.KIND_CHOICES):
+        raise Http404
+    post = get_sharded_or_404(Post.objects.visible(), pk=post_id)
+    toggle_reaction(request.user, post, kind)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
+        FollowSuggestion.objects.filter(
+            user=request.user, author=author
+        ).delete()
     return redirect("posts:follow_index")
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username, active=False)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect("posts:follow_index")
+
+
+@login_required
+def group_follow(request, slug):
+    group = get_group_or_404(slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    GroupFollow.objects.filter(user=request.user, group__slug=slug).delete()
+    return redirect('posts:group_list', slug)
+
+
+def feed_source(request):
+    """Посты и каналы уведомлений ленты, выбранной параметром feed."""
+    feed = request.GET.get('feed', 'index')
+    posts = Post.objects.visible()
+    if feed == 'index':
+        return posts, ['index']
+    if feed == 'group':
+        group = get_group_or_404(request.GET.get('slug'))
+        return posts.filter(group=group), [f'group:{group.id}']
+    if feed == 'follow':
+        if not request.user.is_authenticated:
+            raise PermissionDenied
+        authors = list(Follow.objects.filter(
+            user=request.user
+        ).values_list('author_id', flat=True))
+        groups = list(GroupFollow.objects.filter(
+            user=request.user
+        ).values_list('group_id', flat=True))
+        return (
+            posts.filter(Q(author_id__in=authors) | Q(group_id__in=groups)),
+            [f'author:{author_id}' for author_id in authors]
+            + [f'group:{group_id}' for group_id in groups],
+        )
+    raise Http404
+
+
+@require_GET
+def posts_since(request):
+    posts, _ = feed_source(request)
+    posts = posts.order_by('-pub_date', '-id')
+    if 'cursor' not in request.GET:
+        latest = ScatterGather(posts.only('id', 'pub_date'))[:1]
+        return JsonResponse({
+            'posts': [],
+            'more': False,
+            'cursor': encode_cursor(latest[0]) if latest else None,
+        })
+    cursor = decode_cursor(request.GET['cursor'])
+    if cursor is None:
+        return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+    as_html = request.GET.get('format') == 'html'
+    if as_html:
+        posts = posts.select_related('author', 'group')
+    else:
+        posts = posts.only('id', 'pub_date')
+    # Читаем от курсора вперёд, чтобы при more=True следующий вызов
+    # продолжил с того же места и ничего не пропустил.
+    new_posts = ScatterGather(
+        newer_than(posts.order_by('pub_date', 'id'), cursor),
+        descending=False,
+    )[:settings.POSTS_SINCE_LIMIT + 1]
+    more = len(new_posts) > settings.POSTS_SINCE_LIMIT
+    new_posts = new_posts[:settings.POSTS_SINCE_LIMIT][::-1]
+    data = {
+        'posts': [post.id for post in new_posts],
+        'more': more,
+        'cursor': (
+            encode_cursor(new_posts[0]) if new_posts
+            else request.GET['cursor']
+        ),
+    }
+    if as_html:
+        data['html'] = [
+            render_to_string(
+                'includes/article.html', {'post': post}, request
+            ) for post in new_posts
+        ]
+    return JsonResponse(data)
+
+
+@require_GET
+def feed_stream(request):
+    posts, channels = feed_source(request)
+    backlog = []
+    cursor = decode_cursor(request.META.get('HTTP_LAST_EVENT_ID', ''))
+    if cursor is not None:
+        missed = ScatterGather(
+            newer_than(posts, cursor).order_by('pub_date', 'id').only(
+                'id', 'pub_date'
+            ),
+            descending=False,
+        )[:settings.POSTS_SINCE_LIMIT]
+        backlog = [
+            {'id': post.id, 'cursor': encode_cursor(post)}
+            for post in missed
+        ]
+    response = StreamingHttpResponse(
+        event_stream(channels, backlog),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+def sitemap_chunk(request, file_name=INDEX_FILE):
+    path = os.path.join(settings.SITEMAP_ROOT, file_name)
+    if not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), content_type='application/xml')
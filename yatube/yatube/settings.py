@@ -27,20 +27,25 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -56,7 +61,6 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year',
             ],
         },
     },
@@ -68,9 +72,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Второй шард; используется, только если его добавить в POST_SHARDS.
+    'other': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'other.sqlite3'),
+    },
 }
 
+POST_SHARDS = ['default']
+
+DATABASE_ROUTERS = ['posts.shards.ShardRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.'
@@ -104,6 +117,14 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+STATIC_MAX_AGE = 60
+
+STATIC_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -131,3 +152,107 @@ CACHES = {
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+POST_ARCHIVE_AFTER_DAYS = 365
+
+POST_ARCHIVE_BATCH_SIZE = 500
+
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+PURGE_BATCH_SIZE = 200
+
+PURGE_PAUSE = 0.05
+
+POST_TEXT_RENDERER = 'posts.renderers.linebreaks_renderer'
+
+COMPRESSION_MIN_SIZE = 200
+
+COMPRESSION_BROTLI_QUALITY = 5
+
+COMPRESSION_CACHE_MAX_SIZE = 512 * 1024
+
+COMPRESSION_CACHE_TIMEOUT = 60 * 5
+
+MEDIA_SERVED_PREFIXES = ('posts/', 'cache/')
+
+MEDIA_SENDFILE_BACKEND = None
+
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+MEDIA_PERMISSION_CHECK = None
+
+MEDIA_MAX_AGE = 60 * 60 * 24
+
+POSTS_SINCE_LIMIT = 50
+
+FEED_STREAM_BUFFER = 100
+
+FEED_STREAM_HEARTBEAT = 15
+
+FEED_STREAM_LIFETIME = 60 * 5
+
+FEED_ITEMS = 20
+
+FEED_TITLE_LENGTH = 50
+
+FEED_CACHE_TIMEOUT = 60 * 60
+
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+
+SITEMAP_BASE_URL = 'https://muzhzhukhina.pythonanywhere.com'
+
+SITEMAP_CHUNK_SIZE = 50000
+
+SITEMAP_BATCH_SIZE = 2000
+
+CACHE_STALE_TTL = 60
+
+CACHE_EARLY_EXPIRY_BETA = 1.0
+
+CACHE_LOCK_TIMEOUT = 10
+
+CACHE_WAIT_TIMEOUT = 5
+
+CACHE_WAIT_INTERVAL = 0.05
+
+PROFILE_MIN_SHARE = 0.005
+
+PROFILE_TREE_DEPTH = 40
+
+STARTUP_BUDGET = 2.0
+
+FOLLOW_SUGGESTIONS_LIMIT = 20
+
+FOLLOW_SUGGESTIONS_SHOWN = 5
+
+FOLLOW_SUGGESTIONS_BATCH_SIZE = 1000
+
+DUPLICATE_MIN_TOKENS = 8
+
+DUPLICATE_SIMILARITY = 0.7
+
+DUPLICATE_WINDOW = 60 * 60 * 24
+
+DUPLICATE_CANDIDATES = 200
+
+COMMENT_MAX_DEPTH = 6
+
+COMMENT_COLLAPSE_DEPTH = 3
+
+COUNTER_FLUSH_INTERVAL = 5
+
+POST_VIEW_WINDOW = 60 * 30
+
+SHARD_MOVE_BATCH_SIZE = 500
+
+LAYOUT_CACHE_TIMEOUT = 60 * 60
+
+OBJECT_CACHE_TIMEOUT = 60 * 10
+
+OBJECT_CACHE_LOCAL_SIZE = 500
+
+OBJECT_CACHE_LOCAL_TTL = 5
+
+IMAGE_RELEASE_GRACE = 60 * 60
+
+SHARD_MAP_TTL = 5
@@ -3,11 +3,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('profiling/', include('core.urls', namespace='core')),
     path('', include('posts.urls', namespace='posts')),
 ]
 
@@ -19,5 +22,15 @@ if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
+else:
+    urlpatterns += [
+        path(
+            settings.MEDIA_URL.lstrip('/') + '<path:path>',
+            serve_media,
+            name='media',
+        ),
+    ]
+
+if settings.DEBUG:
     import debug_toolbar
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)